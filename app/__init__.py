@@ -7,13 +7,36 @@ db = SQLAlchemy()
 login_manager = LoginManager()
 
 
-def create_app():
+def create_app(profile=None):
+    """profile: None/"production" (기본) 또는 "test" (APP_PROFILE 환경변수로도 지정)
+
+    test 프로필은 임시 STORAGE_ROOT 와 TEST_DATABASE_URL 을 사용한다.
+    (기본값은 메모리 SQLite, 로컬 Postgres 컨테이너 URL 을 주면 그 DB 로 실행)
+    """
+    profile = profile or os.environ.get("APP_PROFILE", "production")
     app = Flask(__name__)
 
+    # 업로드 파일은 디스크 대신 메모리 버퍼로 받기
+    from app.uploads import SpooledRequest
+    app.request_class = SpooledRequest
+
+    # 리버스 프록시(Render) 뒤: X-Forwarded-Proto / Host 를 믿고 외부 링크를 https 로 생성
+    # PROXY_COUNT = 앞단 프록시 수 (기본 0 = 사용 안 함, Render 등 프록시 뒤에서만 1 로 설정)
+    #  → 프록시 없이 켜면 클라이언트가 보낸 X-Forwarded-Host 가 문자 링크에 들어감
+    proxy_count = int(os.environ.get("PROXY_COUNT", 0))
+    if proxy_count:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=proxy_count, x_host=proxy_count)
+
     # =========================================================
     # 1) STORAGE 경로 (Render / Local 자동 인식)
     # =========================================================
-    if os.path.exists("/var/data"):
+    if profile == "test":
+        import tempfile
+        STORAGE_ROOT = tempfile.mkdtemp(prefix="preop-test-")
+    elif os.environ.get("STORAGE_ROOT"):
+        STORAGE_ROOT = os.environ["STORAGE_ROOT"]
+    elif os.path.exists("/var/data"):
         STORAGE_ROOT = "/var/data"   # Render
     else:
         BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -31,6 +54,68 @@ def create_app():
     app.config["EXCEL_OUTPUT"] = os.path.join(STORAGE_ROOT, "excel_output")
     app.config["NATEON_WEBHOOK_URL"] = os.environ.get("NATEON_WEBHOOK_URL")
 
+    # 네이트온 알림 outbox 전송 (백그라운드, 실패 시 지수 백오프 재시도)
+    app.config["NOTIFY_DISPATCH_INTERVAL"] = int(os.environ.get("NOTIFY_DISPATCH_INTERVAL", 5))   # 초, 0 이면 안 함
+    app.config["NOTIFY_BATCH_SIZE"] = int(os.environ.get("NOTIFY_BATCH_SIZE", 50))
+    app.config["NOTIFY_DIGEST_THRESHOLD"] = int(os.environ.get("NOTIFY_DIGEST_THRESHOLD", 5))    # 이 건수 이상 몰리면 요약 1건
+    app.config["NOTIFY_MAX_ATTEMPTS"] = int(os.environ.get("NOTIFY_MAX_ATTEMPTS", 8))
+    app.config["NOTIFY_RETRY_BASE"] = int(os.environ.get("NOTIFY_RETRY_BASE", 30))     # 초
+    app.config["NOTIFY_RETRY_MAX"] = int(os.environ.get("NOTIFY_RETRY_MAX", 1800))    # 초
+
+    # 업로드 엑셀 파싱 결과 캐시 (내용 해시 기준)
+    app.config["EXCEL_CACHE_MAX_ENTRIES"] = int(os.environ.get("EXCEL_CACHE_MAX_ENTRIES", 8))
+    app.config["EXCEL_CACHE_TTL"] = int(os.environ.get("EXCEL_CACHE_TTL", 600))   # 초
+
+    # 엑셀 리더: "pandas" (기본, 캐시 사용) / "stream" (openpyxl·xlrd 로 한 줄씩)
+    app.config["EXCEL_READER"] = os.environ.get("EXCEL_READER", "pandas")
+
+    # 업로드: 이 크기까지는 메모리에서 처리, UPLOAD_FOLDER 의 오래된 엑셀은 주기적으로 삭제
+    app.config["UPLOAD_SPOOL_MAX_BYTES"] = int(os.environ.get("UPLOAD_SPOOL_MAX_BYTES", 16 * 1024 * 1024))
+    app.config["UPLOAD_PURGE_INTERVAL"] = int(os.environ.get("UPLOAD_PURGE_INTERVAL", 3600))   # 초, 0 이면 안 함
+    app.config["UPLOAD_PURGE_MAX_AGE"] = int(os.environ.get("UPLOAD_PURGE_MAX_AGE", 86400))    # 초
+
+    # 관리자 리스트 페이지네이션: "offset" (페이지 번호) / "keyset" (이전·다음 커서 + 건수 캐시)
+    app.config["LIST_PAGINATION"] = os.environ.get("LIST_PAGINATION", "offset")
+    app.config["LIST_COUNT_CACHE_TTL"] = int(os.environ.get("LIST_COUNT_CACHE_TTL", 30))   # 초
+    app.config["LIST_COUNT_CACHE_MAX_ENTRIES"] = int(os.environ.get("LIST_COUNT_CACHE_MAX_ENTRIES", 256))   # 필터(검색어) 수
+
+    # 환자용 문진 화면 token → 환자 정보 캐시 (워커별, TTL 0 이면 사용 안 함)
+    app.config["PATIENT_CACHE_TTL"] = int(os.environ.get("PATIENT_CACHE_TTL", 60))   # 초
+    app.config["PATIENT_CACHE_MAX_ENTRIES"] = int(os.environ.get("PATIENT_CACHE_MAX_ENTRIES", 1024))
+
+    # 문자 전송: "aligo" (기본) / "stub" (실제로 보내지 않음, 로컬 테스트용)
+    app.config["SMS_TRANSPORT"] = os.environ.get("SMS_TRANSPORT", "aligo")
+
+    # 문진 답변 저장 방식: "eav" (질문별 행, 기본) / "json" (step별 JSON 문서)
+    #  → 바꿀 때는 scripts/migrate_answers.py 로 기존 답변을 먼저 옮길 것
+    app.config["ANSWER_STORAGE"] = os.environ.get("ANSWER_STORAGE", "eav")
+
+    # 요청/SQL/외부 호출 계측 (/admin/preop/metrics), 꺼져 있으면 훅 등록 안 함
+    app.config["METRICS_ENABLED"] = os.environ.get("METRICS_ENABLED", "").strip().lower() in ("1", "true", "y", "yes")
+    app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")   # Prometheus 수집용 Bearer 토큰 (선택)
+
+    # 느린 요청 프로파일 (STORAGE_ROOT/profiles), 둘 다 0 이면 사용 안 함
+    app.config["PROFILE_SLOW_MS"] = int(os.environ.get("PROFILE_SLOW_MS", 0))           # 이 시간 이상 걸린 요청
+    app.config["PROFILE_SAMPLE_RATE"] = int(os.environ.get("PROFILE_SAMPLE_RATE", 0))   # N 요청 중 1개
+    app.config["PROFILE_MODE"] = os.environ.get("PROFILE_MODE", "sample")               # "sample" / "cprofile"
+    app.config["PROFILE_SAMPLE_INTERVAL_MS"] = int(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", 5))
+    app.config["PROFILE_ROUTES"] = os.environ.get("PROFILE_ROUTES", "")                 # endpoint 쉼표 구분, 비우면 전체
+    app.config["PROFILE_KEEP"] = int(os.environ.get("PROFILE_KEEP", 200))
+
+    # 관리자 보기 화면: 제출 완료 환자의 답변 영역 HTML 캐시 (워커별, 0 이면 사용 안 함)
+    app.config["VIEW_CACHE_MAX_ENTRIES"] = int(os.environ.get("VIEW_CACHE_MAX_ENTRIES", 256))
+    # 메모리에서 밀려난 항목을 STORAGE_ROOT/view_cache 에 파일로 보관 (워커끼리 공유)
+    app.config["VIEW_CACHE_SPILL"] = os.environ.get("VIEW_CACHE_SPILL", "").strip().lower() in ("1", "true", "y", "yes")
+    app.config["VIEW_CACHE_DISK_MAX_ENTRIES"] = int(os.environ.get("VIEW_CACHE_DISK_MAX_ENTRIES", 5000))
+
+    # 문진 결과 내보내기: 한 번에 읽는 환자 수, EXCEL_OUTPUT 에 남겨 둘 백그라운드 내보내기 파일 수
+    app.config["EXPORT_BATCH_SIZE"] = int(os.environ.get("EXPORT_BATCH_SIZE", 500))
+    app.config["EXPORT_KEEP"] = int(os.environ.get("EXPORT_KEEP", 20))
+
+    # 템플릿 바이트코드 캐시 (STORAGE_ROOT/jinja_cache) + 시작 시 전체 템플릿 미리 컴파일
+    app.config["TEMPLATE_CACHE"] = os.environ.get("TEMPLATE_CACHE", "1").strip().lower() in ("1", "true", "y", "yes")
+    app.config["TEMPLATE_WARMUP"] = os.environ.get("TEMPLATE_WARMUP", "1").strip().lower() in ("1", "true", "y", "yes")
+
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
     os.makedirs(app.config["PREOP_FOLDER"], exist_ok=True)
     os.makedirs(app.config["FORMS_FOLDER"], exist_ok=True)
@@ -41,12 +126,36 @@ def create_app():
     # =========================================================
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-key")
 
-    db_path = os.path.join(STORAGE_ROOT, "database.db")
-    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+    # DATABASE_URL 이 없으면 STORAGE_ROOT/database.db (SQLite)
+    from app.db_config import database_url, engine_options
+
+    if profile == "test":
+        app.config["TESTING"] = True
+        db_url = database_url(os.environ.get("TEST_DATABASE_URL", "sqlite://"), None)
+    else:
+        db_path = os.path.join(STORAGE_ROOT, "database.db")
+        db_url = database_url(os.environ.get("DATABASE_URL"), db_path)
+
+    app.config["SQLALCHEMY_DATABASE_URI"] = db_url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(db_url, os.environ)
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+    # SQLite 동시성 설정 (WAL / busy_timeout / synchronous / cache / mmap)
+    from app.sqlite_profile import apply_sqlite_profile, load_profile
+    app.config.update(load_profile(os.environ))
+
     db.init_app(app)
     login_manager.init_app(app)
+    apply_sqlite_profile(app)
+
+    from app.metrics import init_metrics
+    init_metrics(app)
+
+    from app.profiling import init_profiling
+    init_profiling(app)
+
+    from app.template_cache import init_template_cache
+    init_template_cache(app)
 
     # =========================================================
     # 4) Blueprint 등록
@@ -64,17 +173,44 @@ def create_app():
     def index():
         return redirect(url_for("auth.login"))
 
+    # 첫 환자 요청이 템플릿 컴파일을 기다리지 않도록 미리 로드
+    if app.config["TEMPLATE_WARMUP"]:
+        from app.template_cache import warm_templates
+        warm_templates(app)
+
+    # =========================================================
+    # 백그라운드 작업 (워커 프로세스마다 첫 요청 때 시작)
+    # =========================================================
+    from app.background import start_periodic
+    from app.uploads import purge_stale_workbooks
+    from app.notifications import dispatch_outbox
+
+    @app.before_request
+    def start_background_jobs():
+        start_periodic(app, "upload-purge", app.config["UPLOAD_PURGE_INTERVAL"], purge_stale_workbooks)
+        start_periodic(app, "notify-outbox", app.config["NOTIFY_DISPATCH_INTERVAL"], dispatch_outbox)
+
     @login_manager.user_loader
     def load_user(user_id):
         from app.models import User
         return User.query.get(int(user_id))
 
     # =========================================================
-    # 5) DB 테이블 생성 + 기본 관리자 계정 생성
+    # 5) DB 스키마 확인
+    #  - 테이블 생성 / 마이그레이션 / 기본 관리자는 scripts/bootstrap.py 에서 한 번
+    #  - 여기서는 버전만 확인하고, 뒤처져 있으면 DB_BOOTSTRAP 에 따라 처리
+    #    "auto" (기본, 잠금 후 직접 초기화) / "check" (경고만) / "skip" (확인 안 함)
     # =========================================================
+    app.config["DB_BOOTSTRAP"] = os.environ.get("DB_BOOTSTRAP", "auto")
+
     with app.app_context():
-        db.create_all()   # 🔥 테이블 자동 생성
-        from app.admin_init import create_default_admin
-        create_default_admin()   # 🔥 테이블 생성 후 관리자 생성
+        if app.config["DB_BOOTSTRAP"] != "skip":
+            from app.bootstrap import ensure_database
+            ensure_database(app)
+
+        # gunicorn --preload: 마스터에서 연 연결을 fork 된 워커가 같이 쓰지 않도록 정리
+        # (메모리 SQLite 는 연결을 닫으면 데이터가 사라지므로 제외)
+        if db.engine.url.database not in (None, "", ":memory:"):
+            db.engine.dispose()
 
     return app
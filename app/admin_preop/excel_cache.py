@@ -0,0 +1,101 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from app.admin_preop.excel_normalize import build_pid_index, strip_frame
+
+
+# ===========================================
+# 파싱된 엑셀 1개 (정규화된 DataFrame + 등록번호 인덱스)
+# ===========================================
+class ParsedWorkbook:
+
+    def __init__(self, df):
+        self.df = df
+        self.loaded_at = time.monotonic()
+
+        # normalize_pid(셀) -> (열, 행 위치)
+        self.pid_index = build_pid_index(df)
+
+    def lookup(self, search_key):
+        """정규화된 등록번호로 (열, 행) 을 찾는다. 없으면 None"""
+        hit = self.pid_index.get(search_key)
+        if hit is None:
+            return None
+        col, pos = hit
+        return col, self.df.iloc[pos]
+
+
+# ===========================================
+# 내용 해시 기준 캐시 (개수 + 나이 기준 만료)
+# ===========================================
+class WorkbookCache:
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest, ttl):
+        with self._lock:
+            wb = self._entries.get(digest)
+            if wb is None:
+                return None
+            if time.monotonic() - wb.loaded_at > ttl:
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return wb
+
+    def put(self, digest, wb, max_entries):
+        with self._lock:
+            self._entries[digest] = wb
+            self._entries.move_to_end(digest)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)   # 가장 오래 안 쓴 것부터 제거
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+workbook_cache = WorkbookCache()
+
+
+def content_hash(excel_file):
+    """업로드 파일 내용의 sha256 (스트림 위치는 처음으로 되돌림)"""
+    h = hashlib.sha256()
+    stream = excel_file.stream
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(64 * 1024), b""):
+        h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+def read_schedule_excel(excel_file):
+    """업로드된 수술 스케줄 엑셀을 문자열 DataFrame 으로 읽고 공백 제거"""
+    import pandas as pd
+
+    # 업로드 스트림(메모리 버퍼)에서 바로 읽기, 전부 문자열로
+    excel_file.stream.seek(0)
+    df = pd.read_excel(excel_file.stream, header=None, dtype=str)
+
+    # 🔥 모든 셀 앞뒤 공백 제거
+    return strip_frame(df)
+
+
+def get_parsed_workbook(excel_file):
+    """같은 내용의 엑셀이면 캐시에서, 아니면 새로 파싱해서 캐시에 저장"""
+    digest = content_hash(excel_file)
+    ttl = current_app.config.get("EXCEL_CACHE_TTL", 600)
+
+    wb = workbook_cache.get(digest, ttl)
+    if wb is not None:
+        return wb
+
+    wb = ParsedWorkbook(read_schedule_excel(excel_file))
+    workbook_cache.put(digest, wb, current_app.config.get("EXCEL_CACHE_MAX_ENTRIES", 8))
+    return wb
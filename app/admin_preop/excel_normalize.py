@@ -0,0 +1,164 @@
+import re
+
+# ===========================================
+# 수술 스케줄 엑셀 정규화 (find_from_excel / parse_excel_gen 공용)
+#  - 단건 처리용 함수 + pandas 열 단위(벡터화) 함수
+#  - pandas 는 열 함수 안에서만 사용 (단건 함수는 pandas 없이 동작)
+# ===========================================
+
+# 엑셀 열 위치 (0부터 시작)
+COL_SURGERY_DATE = 5    # 6번째 열: 수술 날짜
+COL_PATIENT_ID   = 7    # 8번째 열(H): 등록번호
+COL_NAME         = 8    # 9번째 열(I): 이름
+COL_GENDER       = 9    # 10번째 열(J): 성별
+COL_AGE          = 10   # 11번째 열(K): 나이
+COL_SURGERY_NAME = 12   # 13번째 열(M): 수술명
+COL_DOCTOR_NAME  = 13   # 14번째 열(N): 주치의
+COL_GEN          = 14   # 15번째 열(O): 마취 구분 ("Gen")
+COL_PHONE        = 30   # 31번째 열(AF): 전화번호
+
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+AGE_RE = re.compile(r"\d+")
+
+
+class MissingColumnError(KeyError):
+    """필수 열(예: Gen 열)이 엑셀에 없음"""
+
+
+# -------------------------------------------
+# 단건 처리
+# -------------------------------------------
+def normalize_pid(v):
+    """등록번호 정규화: 숫자만 남기고 앞의 0 제거, 모두 0 또는 비면 "0" """
+    if v is None:
+        return ""
+    s = str(v).strip()
+    s = re.sub(r"\D", "", s)   # 숫자만 남기기
+    s = s.lstrip("0")          # 앞의 0 제거
+    return s or "0"
+
+
+def format_pid9(v):
+    """화면 표시용 9자리 0패딩 등록번호"""
+    return normalize_pid(v).zfill(9)
+
+
+def safe(v):
+    """None / NaN → "" , 나머지는 앞뒤 공백 제거한 문자열"""
+    if v is None:
+        return ""
+    try:
+        if v != v:             # NaN 은 자기 자신과 같지 않음
+            return ""
+    except TypeError:          # pd.NA
+        return ""
+    return str(v).strip()
+
+
+def extract_date(v):
+    """날짜만 뽑아내기 (YYYY-MM-DD)"""
+    m = DATE_RE.search(safe(v))
+    return m.group(0) if m else ""
+
+
+def extract_age(v):
+    """나이만 숫자로 뽑기"""
+    m = AGE_RE.search(safe(v))
+    return m.group(0) if m else ""
+
+
+def patient_from_cells(get_col, pid_value):
+    """get_col(열 번호) 로 셀 값을 읽어 환자 dict 생성"""
+    return {
+        "surgery_date": extract_date(get_col(COL_SURGERY_DATE)),
+        # 🔵 엑셀에 있는 원본 값에서 9자리로 포맷
+        "patient_id":   format_pid9(pid_value),
+        "name":         safe(get_col(COL_NAME)),
+        "gender":       safe(get_col(COL_GENDER)),
+        "age":          extract_age(get_col(COL_AGE)),
+        "surgery_name": safe(get_col(COL_SURGERY_NAME)),
+        "doctor_name":  safe(get_col(COL_DOCTOR_NAME)),
+        "phone":        safe(get_col(COL_PHONE)),
+    }
+
+
+def patient_from_row(row, pid_col):
+    """DataFrame 한 행(Series) → 환자 dict (행 길이가 짧으면 빈 값)"""
+    return patient_from_cells(lambda idx: row.get(idx), row[pid_col])
+
+
+# -------------------------------------------
+# 열 단위 (벡터화)
+# -------------------------------------------
+def _text(s):
+    """빈 칸(NaN) 은 "" 로 바꾼 문자열 열"""
+    return s.fillna("").astype(str)
+
+
+def strip_frame(df):
+    """모든 셀 앞뒤 공백 제거 (dtype=str 로 읽은 DataFrame, 빈 칸은 NaN 유지)"""
+    return df.apply(lambda s: _text(s).str.strip().where(s.notna()))
+
+
+def clean_series(s):
+    return _text(s).str.strip()
+
+
+def normalize_pid_series(s):
+    out = _text(s).str.replace(r"\D", "", regex=True).str.lstrip("0")
+    return out.mask(out == "", "0")
+
+
+def extract_date_series(s):
+    return _text(s).str.extract(r"(\d{4}-\d{2}-\d{2})", expand=False).fillna("")
+
+
+def extract_age_series(s):
+    return _text(s).str.extract(r"(\d+)", expand=False).fillna("")
+
+
+def build_pid_index(df):
+    """normalize_pid(셀) -> (열, 행 위치)
+
+    등록번호 열(COL_PATIENT_ID) 을 먼저, 그다음 나머지 열을 왼쪽부터 등록한다.
+    같은 열에서는 위쪽 행이 먼저 → 스트리밍 모드 find_patient 와 결과가 같다.
+    """
+    columns = list(df.columns)
+    if COL_PATIENT_ID in columns:
+        columns.remove(COL_PATIENT_ID)
+        columns.insert(0, COL_PATIENT_ID)
+
+    index = {}
+    for col in columns:
+        first = normalize_pid_series(df[col]).reset_index(drop=True).drop_duplicates()
+        for pos, key in zip(first.index, first.array):
+            index.setdefault(key, (col, pos))
+    return index
+
+
+def gen_patients(df):
+    """15번 열이 "Gen" 인 행들 → 미리보기용 환자 dict 리스트 (열 단위 한 번에 처리)"""
+    import pandas as pd
+
+    if COL_GEN not in df.columns:
+        raise MissingColumnError(COL_GEN)
+
+    rows = df[clean_series(df[COL_GEN]) == "Gen"]
+    empty = pd.Series("", index=rows.index, dtype=object)
+
+    def col(idx):
+        return rows[idx] if idx in rows.columns else empty
+
+    out = pd.DataFrame({
+        "surgery_date": extract_date_series(col(COL_SURGERY_DATE)),
+        "patient_id":   normalize_pid_series(col(COL_PATIENT_ID)).str.zfill(9),
+        "name":         clean_series(col(COL_NAME)),
+        "gender":       clean_series(col(COL_GENDER)),
+        "age":          extract_age_series(col(COL_AGE)),
+        "surgery_name": clean_series(col(COL_SURGERY_NAME)),
+        "doctor_name":  clean_series(col(COL_DOCTOR_NAME)),
+        "phone":        clean_series(col(COL_PHONE)),
+    })
+
+    out = out[(out["patient_id"] != "") & (out["name"] != "")]
+    return out.to_dict("records")
@@ -0,0 +1,145 @@
+from datetime import date, datetime, time
+
+from app.admin_preop.excel_normalize import (
+    COL_AGE, COL_DOCTOR_NAME, COL_GEN, COL_GENDER, COL_NAME, COL_PATIENT_ID,
+    COL_PHONE, COL_SURGERY_DATE, COL_SURGERY_NAME,
+    MissingColumnError, normalize_pid, patient_from_cells, safe,
+)
+
+# ===========================================
+# pandas 없이 엑셀을 한 줄씩 읽는 리더
+#  - .xlsx : openpyxl read-only 모드 (시트 전체를 메모리에 올리지 않음)
+#  - .xls  : xlrd (on_demand)
+#  - 필요한 열만 뽑아서 넘기고, 등록번호 열에서 찾으면 바로 중단
+# ===========================================
+
+# parse_excel_gen 에서 쓰는 열들
+GEN_COLUMNS = (
+    COL_SURGERY_DATE, COL_PATIENT_ID, COL_NAME, COL_GENDER, COL_AGE,
+    COL_SURGERY_NAME, COL_DOCTOR_NAME, COL_GEN, COL_PHONE,
+)
+
+XLS_MAGIC = b"\xd0\xcf\x11\xe0"   # OLE2 (구형 .xls)
+
+
+def cell_text(v):
+    """셀 값을 pandas read_excel(dtype=str) 과 같은 모양의 문자열로"""
+    if v is None:
+        return None
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))          # 100007.0 → "100007"
+    if isinstance(v, datetime):
+        return v.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(v, (date, time)):
+        return v.isoformat()
+    return str(v).strip()
+
+
+def _iter_xlsx(stream):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        for row in ws.iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def _iter_xls(stream):
+    import xlrd
+
+    book = xlrd.open_workbook(file_contents=stream.read(), on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        for i in range(sheet.nrows):
+            row = []
+            for cell in sheet.row(i):
+                if cell.ctype == xlrd.XL_CELL_DATE:
+                    row.append(xlrd.xldate_as_datetime(cell.value, book.datemode))
+                elif cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                    row.append(None)
+                else:
+                    row.append(cell.value)
+            yield row
+    finally:
+        book.release_resources()
+
+
+def iter_rows(stream, columns=None):
+    """첫 번째 시트를 한 줄씩 읽는다.
+
+    columns 를 주면 {열 번호: 문자열} 만, 없으면 행 전체를 문자열 리스트로 넘긴다.
+    """
+    stream.seek(0)
+    head = stream.read(len(XLS_MAGIC))
+    stream.seek(0)
+    rows = _iter_xls(stream) if head == XLS_MAGIC else _iter_xlsx(stream)
+
+    for row in rows:
+        if columns is None:
+            yield [cell_text(v) for v in row]
+        else:
+            yield {c: cell_text(row[c]) for c in columns if c < len(row)}
+
+
+def find_patient(stream, search_key):
+    """정규화된 등록번호로 찾은 행 → 환자 dict (없으면 None)
+
+    pandas 모드(build_pid_index)와 같은 우선순위:
+      1) 등록번호 열(COL_PATIENT_ID) 에서 처음 나온 행 → 찾는 즉시 멈춤
+      2) 없으면 나머지 열을 한 번 더 읽어서 "가장 왼쪽 열 → 그 열의 첫 행"
+    """
+    for row in iter_rows(stream):
+        value = row[COL_PATIENT_ID] if COL_PATIENT_ID < len(row) else None
+        if value is not None and normalize_pid(value) == search_key:
+            return _patient_from_list(row, COL_PATIENT_ID)
+
+    return _find_in_other_columns(stream, search_key)
+
+
+def _find_in_other_columns(stream, search_key):
+    found_col, found_row = None, None
+
+    for row in iter_rows(stream):
+        limit = len(row) if found_col is None else min(found_col, len(row))
+        for col in range(limit):
+            value = row[col]
+            if col != COL_PATIENT_ID and value is not None and normalize_pid(value) == search_key:
+                found_col, found_row = col, row
+                break
+        if found_col == 0:
+            break
+
+    return None if found_row is None else _patient_from_list(found_row, found_col)
+
+
+def _patient_from_list(row, pid_col):
+    def get_col(idx):
+        return row[idx] if idx < len(row) else ""
+    return patient_from_cells(get_col, row[pid_col])
+
+
+def gen_patients(stream):
+    """15번 열이 "Gen" 인 행들 → 미리보기용 환자 dict 리스트"""
+    patients = []
+    has_gen_col = False
+
+    for cells in iter_rows(stream, GEN_COLUMNS):
+        if COL_GEN not in cells:
+            continue
+        has_gen_col = True
+
+        if safe(cells[COL_GEN]) != "Gen":
+            continue
+
+        p = patient_from_cells(cells.get, cells.get(COL_PATIENT_ID))
+        if not p["patient_id"] or not p["name"]:
+            continue
+        patients.append(p)
+
+    if not has_gen_col:
+        raise MissingColumnError(COL_GEN)
+
+    return patients
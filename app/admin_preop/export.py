@@ -0,0 +1,288 @@
+import csv
+import io
+import os
+import re
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select, tuple_
+
+from app import db
+from app.job_state import load_job, prune_jobs, save_job
+from app.models import PreOpPatient
+from app.preop.answers import answer_keys, load_answers_for
+
+# ===========================================
+# 문진 결과 내보내기 (CSV / XLSX)
+#  - 필터: 수술일 범위 / 주치의 / 제출 여부
+#  - 한 행 = 환자 1명 + step 별 답변을 열로 펼침 ("{step}. {question}")
+#  - 환자는 (수술일, 이름, id) 키셋으로 EXPORT_BATCH_SIZE 명씩 읽고, 답변도 그 묶음만 조회
+#    → 행 수와 관계없이 메모리 사용량 일정
+#  - XLSX 는 openpyxl write_only (행을 임시 파일에 바로 씀)
+#  - 큰 내보내기는 백그라운드로 EXCEL_OUTPUT 에 파일 생성 후 다운로드 (최근 EXPORT_KEEP 개 보관)
+#    진행 상황은 같은 폴더의 export_<id>.json (어느 워커에서든 조회 가능)
+# ===========================================
+
+FORMATS = ("csv", "xlsx")
+
+PATIENT_COLUMNS = [
+    ("surgery_date", "수술날짜"),
+    ("patient_id", "등록번호"),
+    ("name", "이름"),
+    ("gender", "성별"),
+    ("age", "나이"),
+    ("phone", "전화번호"),
+    ("surgery_name", "수술명"),
+    ("doctor_name", "주치의"),
+    ("submitted", "제출"),
+]
+
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+JOB_PREFIX = "export_"
+
+
+# -------------------------------------------
+# 필터
+# -------------------------------------------
+def export_filters(args):
+    """요청 값(dict) → 필터 dict, 잘못된 값이면 ValueError
+
+    date       : 하루 (date_from = date_to)
+    date_from  : 수술일 시작 (YYYY-MM-DD, 포함)
+    date_to    : 수술일 끝 (포함)
+    doctor     : 주치의 이름 (정확히 일치)
+    submitted  : "1" 제출 완료만 / "0" 미제출만 / 없으면 전체
+    """
+    date_from = (args.get("date_from") or args.get("date") or "").strip()
+    date_to = (args.get("date_to") or args.get("date") or "").strip()
+
+    for value in (date_from, date_to):
+        if value and not DATE_RE.match(value):
+            raise ValueError(f"날짜 형식이 올바르지 않습니다: {value}")
+
+    submitted = str(args.get("submitted") or "").strip()
+    if submitted not in ("", "1", "0"):
+        raise ValueError("submitted 는 1 또는 0 이어야 합니다.")
+
+    return {
+        "date_from": date_from or None,
+        "date_to": date_to or None,
+        "doctor": (args.get("doctor") or "").strip() or None,
+        "submitted": {"1": True, "0": False}.get(submitted),
+    }
+
+
+def _where(query, filters):
+    query = query.where(PreOpPatient.cancelled_at.is_(None))   # 재업로드로 취소된 환자 제외
+    if filters["date_from"]:
+        query = query.where(PreOpPatient.surgery_date >= filters["date_from"])
+    if filters["date_to"]:
+        query = query.where(PreOpPatient.surgery_date <= filters["date_to"])
+    if filters["doctor"]:
+        query = query.where(PreOpPatient.doctor_name == filters["doctor"])
+    if filters["submitted"] is True:
+        query = query.where(PreOpPatient.submitted.is_(True))
+    elif filters["submitted"] is False:
+        query = query.where(PreOpPatient.submitted.is_not(True))
+    return query
+
+
+def export_filename(filters, fmt, job_id=None):
+    if filters["date_from"] and filters["date_from"] == filters["date_to"]:
+        label = filters["date_from"]
+    elif filters["date_from"] or filters["date_to"]:
+        label = f"{filters['date_from'] or ''}~{filters['date_to'] or ''}"
+    else:
+        label = "all"
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    # 백그라운드 작업은 같은 초에 같은 필터로 시작해도 파일이 겹치지 않도록 작업 id 포함
+    suffix = f"_{job_id[:8]}" if job_id else ""
+    return f"preop_{label}_{stamp}{suffix}.{fmt}"
+
+
+# -------------------------------------------
+# 행 생성
+# -------------------------------------------
+def iter_rows(filters, batch_size=None):
+    """첫 행은 헤더, 이후 환자 1명당 1행 (list)"""
+    batch_size = batch_size or current_app.config["EXPORT_BATCH_SIZE"]
+
+    keys = answer_keys(_where(select(PreOpPatient.id), filters))
+    yield [label for _, label in PATIENT_COLUMNS] + [f"{step}. {question}" for step, question in keys]
+
+    order = (PreOpPatient.surgery_date, PreOpPatient.name, PreOpPatient.id)
+    query = _where(select(PreOpPatient), filters).order_by(*order).limit(batch_size)
+    last = None
+
+    while True:
+        page = query if last is None else query.where(tuple_(*order) > last)
+        patients = db.session.execute(page).scalars().all()
+        if not patients:
+            return
+
+        answers = load_answers_for([p.id for p in patients])
+        for p in patients:
+            saved = answers[p.id]
+            row = [_patient_value(p, field) for field, _ in PATIENT_COLUMNS]
+            row += [saved.get(step, {}).get(question, "") for step, question in keys]
+            yield row
+
+        last = (p.surgery_date, p.name, p.id)
+        db.session.expunge_all()   # 읽은 환자 객체가 세션에 쌓이지 않도록
+
+
+def _patient_value(patient, field):
+    value = getattr(patient, field)
+    if field == "submitted":
+        return "Y" if value else "N"
+    return "" if value is None else value
+
+
+def _safe_text(value):
+    """엑셀에서 수식으로 해석되지 않도록 (= + - @ 로 시작하는 답변)"""
+    value = "" if value is None else str(value)
+    if value[:1] in ("=", "+", "-", "@"):
+        return "'" + value
+    return value
+
+
+# -------------------------------------------
+# 형식별 출력
+# -------------------------------------------
+def stream_csv(rows, flush_rows=200):
+    """행 → CSV bytes 조각 (엑셀에서 한글이 깨지지 않도록 BOM 포함)"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")
+
+    for i, row in enumerate(rows, 1):
+        writer.writerow([_safe_text(v) for v in row])
+        if i % flush_rows == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def write_xlsx(rows, fileobj):
+    """행 → XLSX (write_only, fileobj 는 경로 또는 binary 파일)"""
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("문진")
+    for row in rows:
+        ws.append([ILLEGAL_CHARACTERS_RE.sub("", _safe_text(v)) for v in row])
+    wb.save(fileobj)
+
+
+def stream_xlsx(rows, chunk_size=64 * 1024):
+    """XLSX 는 zip 이라 저장이 끝나야 내보낼 수 있음 → 임시 파일에 쓴 뒤 조각으로"""
+    with tempfile.TemporaryFile() as f:
+        write_xlsx(rows, f)
+        f.seek(0)
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def stream_export(filters, fmt):
+    rows = iter_rows(filters)
+    return stream_csv(rows) if fmt == "csv" else stream_xlsx(rows)
+
+
+# ===========================================
+# 백그라운드 내보내기 → EXCEL_OUTPUT
+# ===========================================
+def start_export(filters, fmt):
+    """내보내기 시작 → 상태 dict (파일은 백그라운드에서 생성)"""
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "status": "running",
+        "format": fmt,
+        "filters": filters,
+        "filename": export_filename(filters, fmt, job_id),
+        "rows": 0,
+        "error": None,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "finished_at": None,
+    }
+    save_job(current_app.config["EXCEL_OUTPUT"], job, prefix=JOB_PREFIX)
+
+    app = current_app._get_current_object()
+    threading.Thread(
+        target=_run_export,
+        args=(app, job),
+        name=f"preop-export-{job['id'][:8]}",
+        daemon=True,
+    ).start()
+
+    return dict(job)
+
+
+def get_export(job_id):
+    return load_job(current_app.config["EXCEL_OUTPUT"], job_id, prefix=JOB_PREFIX)
+
+
+def _counted(rows, job, folder, every):
+    """행 수를 세면서 every 행마다 진행 상황 기록"""
+    for i, row in enumerate(rows):
+        if i:                 # 헤더 제외
+            job["rows"] = i
+            if i % every == 0:
+                save_job(folder, job, prefix=JOB_PREFIX)
+        yield row
+
+
+def _run_export(app, job):
+    with app.app_context():
+        folder = app.config["EXCEL_OUTPUT"]
+        path = os.path.join(folder, job["filename"])
+        tmp = path + ".part"
+        try:
+            rows = _counted(iter_rows(job["filters"]), job, folder, app.config["EXPORT_BATCH_SIZE"])
+            if job["format"] == "csv":
+                with open(tmp, "wb") as f:
+                    for chunk in stream_csv(rows):
+                        f.write(chunk)
+            else:
+                write_xlsx(rows, tmp)
+            os.replace(tmp, path)   # 다 쓴 파일만 다운로드 가능
+
+            prune_exports(folder, app.config["EXPORT_KEEP"])
+            prune_jobs(folder, app.config["EXPORT_KEEP"], prefix=JOB_PREFIX)
+            job["status"] = "done"
+        except Exception as e:
+            app.logger.exception("[EXPORT] 내보내기 실패")
+            job["status"] = "failed"
+            job["error"] = str(e)
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+        finally:
+            db.session.remove()
+            job["finished_at"] = datetime.now().isoformat(timespec="seconds")
+            save_job(folder, job, prefix=JOB_PREFIX)
+
+
+def prune_exports(folder, keep):
+    """EXCEL_OUTPUT 의 내보내기 파일은 최근 keep 개만 남김"""
+    names = sorted(
+        (n for n in os.listdir(folder) if n.startswith("preop_") and n.endswith(FORMATS)),
+        key=lambda n: os.path.getmtime(os.path.join(folder, n)),
+    )
+    for name in names[:-keep] if keep else []:
+        try:
+            os.remove(os.path.join(folder, name))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,298 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert, select, tuple_, union, update
+
+from app import db
+from app.models import PreOpAssessment, PreOpPatient, PreOpStepAnswers
+
+# ===========================================
+# 엑셀 미리보기 환자 목록 → DB 일괄 등록
+#  - 기존 (등록번호, 수술일) 은 한 번의 쿼리로 조회
+#  - 새 환자는 bulk insert 한 번 + 한 트랜잭션 (source="gen" 으로 표시)
+#  - 행마다 결과(inserted / duplicate / invalid) 반환
+# ===========================================
+
+SOURCE_GEN = "gen"
+
+PATIENT_FIELDS = (
+    "surgery_date", "patient_id", "name", "gender", "age",
+    "surgery_name", "doctor_name", "phone",
+)
+
+# 재업로드 시 비교/수정 대상 (등록번호는 매칭 키)
+UPDATE_FIELDS = (
+    "surgery_date", "name", "gender", "age",
+    "surgery_name", "doctor_name", "phone",
+)
+
+
+def clean_patient(p):
+    """미리보기 JSON 한 건 → 컬럼 dict (문자열 앞뒤 공백 제거, None 은 "")"""
+    return {f: str(p.get(f) or "").strip() for f in PATIENT_FIELDS}
+
+
+def validate_patient(row):
+    """필수값 누락 사유 (문제 없으면 None)"""
+    if not row["patient_id"] or not row["name"]:
+        return "등록번호 또는 이름이 없습니다."
+    if not row["surgery_date"]:
+        return "수술 날짜가 없습니다."
+    return None
+
+
+def existing_pairs(rows):
+    """rows 에 나오는 (등록번호, 수술일) 중 이미 DB 에 있는 것들 (쿼리 1번)"""
+    if not rows:
+        return set()
+
+    pids = {r["patient_id"] for r in rows}
+    dates = {r["surgery_date"] for r in rows}
+
+    result = db.session.execute(
+        select(PreOpPatient.patient_id, PreOpPatient.surgery_date)
+        .where(PreOpPatient.surgery_date.in_(dates), PreOpPatient.patient_id.in_(pids))
+    )
+    return {(pid, d) for pid, d in result}
+
+
+def import_patients(patients):
+    """환자 목록 일괄 등록. 행별 결과 리스트 반환 (commit 포함)"""
+    results = []
+    candidates = []
+
+    for idx, p in enumerate(patients):
+        if not isinstance(p, dict):
+            results.append({"index": idx, "status": "invalid", "reason": "잘못된 형식입니다."})
+            continue
+
+        row = clean_patient(p)
+        reason = validate_patient(row)
+        if reason:
+            results.append({"index": idx, "patient_id": row["patient_id"], "status": "invalid", "reason": reason})
+            continue
+
+        candidates.append((idx, row))
+
+    # 중복 방지: 같은 수술일 + 등록번호가 이미 있거나, 같은 목록 안에서 반복되면 건너뜀
+    seen = existing_pairs([row for _, row in candidates])
+    new_rows = []
+
+    duplicates = set()
+
+    for idx, row in candidates:
+        key = (row["patient_id"], row["surgery_date"])
+        if key in seen:
+            duplicates.add(key)
+            results.append({"index": idx, "patient_id": row["patient_id"], "status": "duplicate"})
+            continue
+
+        seen.add(key)
+        new_rows.append(dict(row, token=uuid.uuid4().hex, source=SOURCE_GEN))
+        results.append({"index": idx, "patient_id": row["patient_id"], "status": "inserted"})
+
+    if new_rows:
+        db.session.execute(insert(PreOpPatient), new_rows)
+
+    # 재업로드로 취소됐던 환자가 다시 올라오면 취소 해제
+    if duplicates:
+        db.session.execute(
+            update(PreOpPatient)
+            .where(
+                PreOpPatient.cancelled_at.is_not(None),
+                tuple_(PreOpPatient.patient_id, PreOpPatient.surgery_date).in_(duplicates),
+            )
+            .values(cancelled_at=None),
+            execution_options={"synchronize_session": False},
+        )
+    db.session.commit()
+
+    results.sort(key=lambda r: r["index"])
+    return results
+
+
+# ===========================================
+# 스케줄 재업로드: 바뀐 것만 반영
+#  - 엑셀에 나온 수술일(들)의 기존 환자와 비교
+#  - 엑셀 날짜에 있던 환자가 엑셀에서 빠지고, 같은 등록번호가 엑셀의 다른 날짜에 나오면 "날짜 변경"
+#    (엑셀 날짜 밖의 기존 수술 / 제출 완료 환자는 건드리지 않고 신규로 등록)
+#  - 엑셀에서 사라진 환자는 삭제하지 않고 cancelled_at 표시 (다시 나오면 취소 해제)
+#    단 Gen 일괄 등록 환자가 아니거나, 제출 완료 / 답변 있음 / 문자 발송한 환자는
+#    취소하지 않고 protected 로 따로 보여줌 (엑셀 누락 때문에 기록이 사라지지 않도록)
+# ===========================================
+def diff_schedule(patients):
+    """엑셀 환자 목록 vs DB → 변경 내역 (inserts / updates / restores / cancels / protected)"""
+    rows = []
+    invalid = 0
+    keys = set()
+
+    for p in patients:
+        row = clean_patient(p) if isinstance(p, dict) else None
+        if row is None or validate_patient(row):
+            invalid += 1
+            continue
+        key = (row["patient_id"], row["surgery_date"])
+        if key in keys:
+            continue
+        keys.add(key)
+        rows.append(row)
+
+    changes = {
+        "inserts": [], "updates": [], "restores": [], "cancels": [], "protected": [],
+        "unchanged": 0, "invalid": invalid,
+    }
+    if not rows:
+        return changes
+
+    dates = {r["surgery_date"] for r in rows}
+
+    # 영향받는 기존 환자 = 엑셀 날짜의 환자 (쿼리 1번)
+    existing = db.session.execute(
+        select(
+            PreOpPatient.id, PreOpPatient.submitted, PreOpPatient.sms_sent,
+            PreOpPatient.source, PreOpPatient.cancelled_at,
+            *[getattr(PreOpPatient, f) for f in PATIENT_FIELDS],
+        )
+        .where(PreOpPatient.surgery_date.in_(dates))
+        .order_by(PreOpPatient.surgery_date, PreOpPatient.id)
+    ).mappings().all()
+
+    by_key = {(e["patient_id"], e["surgery_date"]): e for e in existing}
+    by_pid = {}
+    for e in existing:
+        by_pid.setdefault(e["patient_id"], []).append(e)
+    matched = set()
+    pending = []
+
+    # 1) 등록번호 + 수술일이 같은 환자 → 값 비교
+    for row in rows:
+        e = by_key.get((row["patient_id"], row["surgery_date"]))
+        if e is None:
+            pending.append(row)
+            continue
+        matched.add(e["id"])
+        _diff_row(changes, e, row)
+
+    # 2) 같은 등록번호가 엑셀의 다른 날짜에 있었는데 엑셀에서 빠졌으면 → 수술일 변경, 아니면 신규
+    #    (제출 완료 환자는 문진 기록이 그 수술일 것이므로, 취소된 환자는 취소 상태이므로 옮기지 않음)
+    for row in pending:
+        e = next(
+            (
+                e for e in by_pid.get(row["patient_id"], [])
+                if e["id"] not in matched and not e["submitted"] and e["cancelled_at"] is None
+            ),
+            None,
+        )
+        if e is None:
+            changes["inserts"].append(row)
+            continue
+        matched.add(e["id"])
+        _diff_row(changes, e, row)
+
+    # 3) 엑셀 날짜에 있었는데 엑셀에서 빠진 환자 → 취소 (보호 대상은 protected)
+    missing = [e for e in existing if e["id"] not in matched and e["cancelled_at"] is None]
+    answered = _answered_ids([e["id"] for e in missing])
+
+    for e in missing:
+        item = {
+            "id": e["id"],
+            "patient_id": e["patient_id"],
+            "name": e["name"],
+            "surgery_date": e["surgery_date"],
+        }
+        reasons = _protect_reasons(e, answered)
+        if reasons:
+            changes["protected"].append(dict(item, reasons=reasons))
+        else:
+            changes["cancels"].append(item)
+
+    return changes
+
+
+def _answered_ids(patient_ids):
+    """답변(EAV / JSON 어느 쪽이든)이 하나라도 있는 환자 id"""
+    if not patient_ids:
+        return set()
+    query = union(
+        select(PreOpAssessment.patient_id).where(PreOpAssessment.patient_id.in_(patient_ids)),
+        select(PreOpStepAnswers.patient_id).where(PreOpStepAnswers.patient_id.in_(patient_ids)),
+    )
+    return set(db.session.execute(query).scalars())
+
+
+def _protect_reasons(existing, answered):
+    reasons = []
+    if existing["source"] != SOURCE_GEN:
+        reasons.append("개별 등록")
+    if existing["submitted"]:
+        reasons.append("제출 완료")
+    elif existing["id"] in answered:
+        reasons.append("답변 있음")
+    if existing["sms_sent"]:
+        reasons.append("문자 발송")
+    return reasons
+
+
+def _diff_row(changes, existing, row):
+    # 취소됐던 환자가 다시 엑셀에 나오면 취소 해제
+    if existing["cancelled_at"] is not None:
+        changes["restores"].append({
+            "id": existing["id"],
+            "patient_id": existing["patient_id"],
+            "name": existing["name"],
+            "surgery_date": row["surgery_date"],
+        })
+
+    # 엑셀 값이 비어 있으면 기존 값을 지우지 않음
+    diff = {
+        f: [existing[f], row[f]]
+        for f in UPDATE_FIELDS
+        if row[f] and row[f] != (existing[f] or "")
+    }
+    if not diff:
+        if existing["cancelled_at"] is None:
+            changes["unchanged"] += 1
+        return
+
+    changes["updates"].append({
+        "id": existing["id"],
+        "patient_id": existing["patient_id"],
+        "name": existing["name"],
+        "changes": diff,
+    })
+
+
+def apply_schedule_changes(changes):
+    """diff_schedule 결과를 한 트랜잭션으로 반영. 취소 표시한 환자 id 목록 반환"""
+    if changes["inserts"]:
+        db.session.execute(
+            insert(PreOpPatient),
+            [dict(row, token=uuid.uuid4().hex, source=SOURCE_GEN) for row in changes["inserts"]],
+        )
+
+    if changes["updates"]:
+        db.session.execute(
+            update(PreOpPatient),
+            [
+                {"id": u["id"], **{f: new for f, (_, new) in u["changes"].items()}}
+                for u in changes["updates"]
+            ],
+        )
+
+    if changes["restores"]:
+        db.session.execute(
+            update(PreOpPatient),
+            [{"id": r["id"], "cancelled_at": None} for r in changes["restores"]],
+        )
+
+    # 삭제하지 않고 취소 표시만 (protected 환자는 그대로)
+    cancel_ids = [c["id"] for c in changes["cancels"]]
+    if cancel_ids:
+        now = datetime.utcnow()
+        db.session.execute(
+            update(PreOpPatient),
+            [{"id": pid, "cancelled_at": now} for pid in cancel_ids],
+        )
+
+    db.session.commit()
+    return cancel_ids
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select, tuple_
+
+from app import db
+from app.models import PreOpPatient
+
+# ===========================================
+# 환자 리스트 키셋(커서) 페이지네이션
+#  - 정렬: (수술일, 이름, id) → 인덱스 (surgery_date, name) 로 바로 이어서 읽음
+#  - OFFSET 없이 "마지막으로 본 행 다음부터" 조회 → 깊은 페이지도 일정한 속도
+#  - 커서는 환자 id 만 (이름이 URL / 접속 로그 / 방문 기록에 남지 않도록)
+#    → 정렬 키 (수술일, 이름, id) 는 id 로 한 번 조회해서 얻음
+#  - 전체 건수는 필터별로 잠깐 캐시 (매 페이지마다 COUNT 안 함)
+# ===========================================
+
+SORT_COLUMNS = (PreOpPatient.surgery_date, PreOpPatient.name, PreOpPatient.id)
+
+
+def encode_cursor(p):
+    return str(p.id)
+
+
+def decode_cursor(value):
+    """커서(환자 id) → 정렬 키. 잘못된 커서거나 그 사이 삭제된 환자면 None (첫 페이지로)"""
+    if not value or not value.isdigit():
+        return None
+    row = db.session.execute(select(*SORT_COLUMNS).where(PreOpPatient.id == int(value))).first()
+    return tuple(row) if row else None
+
+
+class KeysetPage:
+
+    def __init__(self, items, total, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.total = total
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(query, per_page, after=None, before=None, total=None):
+    """after: 이 행 다음 페이지 / before: 이 행 이전 페이지 / 둘 다 없으면 첫 페이지"""
+    key = tuple_(*SORT_COLUMNS)
+
+    if before is not None:
+        rows = (
+            query.filter(key < tuple_(*before))
+            .order_by(*[c.desc() for c in SORT_COLUMNS])
+            .limit(per_page + 1)
+            .all()
+        )
+        more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        return KeysetPage(
+            items,
+            total,
+            next_cursor=encode_cursor(items[-1]) if items else None,
+            prev_cursor=encode_cursor(items[0]) if items and more else None,
+        )
+
+    if after is not None:
+        query = query.filter(key > tuple_(*after))
+
+    rows = query.order_by(*SORT_COLUMNS).limit(per_page + 1).all()
+    more = len(rows) > per_page
+    items = rows[:per_page]
+    return KeysetPage(
+        items,
+        total,
+        next_cursor=encode_cursor(items[-1]) if items and more else None,
+        prev_cursor=encode_cursor(items[0]) if items and after is not None else None,
+    )
+
+
+# ===========================================
+# 필터별 전체 건수 캐시 (프로세스 단위, TTL + LRU)
+#  - 만료된 건수는 읽을 때 지우고, max_entries 를 넘으면 가장 오래 안 쓴 것부터 버림
+#    (검색어마다 키가 생기므로 한도가 없으면 계속 쌓임)
+#  - 환자 추가/수정/삭제 시 invalidate_counts() 로 비움
+# ===========================================
+class CountCache:
+
+    def __init__(self):
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_count(self, key, query, ttl, max_entries=256):
+        now = time.monotonic()
+        with self._lock:
+            hit = self._counts.get(key)
+            if hit is not None:
+                if hit[1] > now:
+                    self._counts.move_to_end(key)
+                    return hit[0]
+                del self._counts[key]
+
+        count = query.order_by(None).count()
+        with self._lock:
+            self._counts[key] = (count, now + ttl)
+            self._counts.move_to_end(key)
+            while len(self._counts) > max_entries:
+                self._counts.popitem(last=False)
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+count_cache = CountCache()
+
+
+def invalidate_counts():
+    count_cache.clear()
@@ -1,15 +1,17 @@
 from flask import render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
 from app.admin_preop import admin_preop_bp
-from app.models import PreOpPatient, PreOpAssessment
+from app.admin_preop.pagination import invalidate_counts
+from app.metrics import timed_external
+from app.profiling import note_patients
+from app.preop.patient_cache import invalidate_patient
+from app.view_cache import invalidate_view
+from app.models import PreOpPatient
 from app import db
 from datetime import datetime, date     # ← date 추가
 import uuid
 from zoneinfo import ZoneInfo
 KST = ZoneInfo("Asia/Seoul")
-import os
-import re
-import requests
 
 # ===========================================
 # 관리자용: 엑셀 기반 환자 등록 페이지
@@ -27,8 +29,6 @@ def preop_create_excel():
 # ===========================================
 # 관리자용: 환자 리스트
 # ===========================================
-from sqlalchemy import or_
-
 @admin_preop_bp.route("/list")
 @login_required
 def preop_list():
@@ -40,19 +40,13 @@ def preop_list():
     q = request.args.get("q", "").strip()
     date_str = request.args.get("date", "").strip()
 
-    base_query = PreOpPatient.query
+    # 스케줄 재업로드로 취소된 환자는 제외 (다시 올라오면 취소 해제)
+    base_query = PreOpPatient.query.filter(PreOpPatient.cancelled_at.is_(None))
 
-    # ✅ 검색어가 있으면 → 날짜와 상관없이 전체에서 검색
+    # ✅ 검색어가 있으면 → 날짜와 상관없이 전체에서 검색 (FTS 인덱스 우선)
     if q:
-        query = base_query.filter(
-            or_(
-                PreOpPatient.name.like(f"%{q}%"),
-                PreOpPatient.patient_id.like(f"%{q}%"),
-                PreOpPatient.phone.like(f"%{q}%"),
-                PreOpPatient.doctor_name.like(f"%{q}%"),
-                PreOpPatient.surgery_name.like(f"%{q}%"),
-            )
-        )
+        from app.admin_preop.search import patient_search_filter
+        query = base_query.filter(patient_search_filter(q))
         # 날짜 입력이 있더라도 검색 모드에서는 날짜를 강제하지 않음
         selected_date = date_str  # 그냥 화면에만 유지용
     else:
@@ -62,12 +56,42 @@ def preop_list():
         query = base_query.filter(PreOpPatient.surgery_date == date_str)
         selected_date = date_str
 
+    per_page = 10
+
+    # 🔹 키셋(커서) 모드: OFFSET / 매번 COUNT 없이 (수술일, 이름, id) 기준으로 이어서 조회
+    if current_app.config.get("LIST_PAGINATION") == "keyset":
+        from app.admin_preop.pagination import count_cache, decode_cursor, keyset_paginate
+
+        count_key = f"q:{q}" if q else f"date:{date_str}"
+        total = count_cache.get_or_count(
+            count_key,
+            query,
+            current_app.config.get("LIST_COUNT_CACHE_TTL", 30),
+            current_app.config.get("LIST_COUNT_CACHE_MAX_ENTRIES", 256),
+        )
+
+        pagination = keyset_paginate(
+            query,
+            per_page,
+            after=decode_cursor(request.args.get("after")),
+            before=decode_cursor(request.args.get("before")),
+            total=total,
+        )
+
+        return render_template(
+            "admin_preop/list.html",
+            patients=pagination.items,
+            pagination=pagination,
+            keyset=True,
+            q=q,
+            selected_date=selected_date,
+        )
+
     # 정렬
-    query = query.order_by(PreOpPatient.surgery_date.asc(), PreOpPatient.name.asc())
+    query = query.order_by(PreOpPatient.surgery_date.asc(), PreOpPatient.name.asc(), PreOpPatient.id.asc())
 
     # 페이지네이션
     page = request.args.get("page", 1, type=int)
-    per_page = 10
 
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     patients = pagination.items
@@ -92,21 +116,14 @@ def preop_view(patient_id):
 
     patient = PreOpPatient.query.get_or_404(patient_id)
 
-    rows = PreOpAssessment.query.filter_by(
-        patient_id=patient.id
-    ).order_by(PreOpAssessment.step).all()
-
-    saved_data = {}
-
-    for r in rows:
-        if r.step not in saved_data:
-            saved_data[r.step] = {}
-        saved_data[r.step][r.question] = r.answer
+    # step 2~9 답변 영역 (제출 완료 환자는 (id, updated_at) 기준 캐시)
+    from app.view_cache import render_answers
+    answers_html = render_answers(patient)
 
     return render_template(
         "admin_preop/view.html",
         patient=patient,
-        saved_data=saved_data
+        answers_html=answers_html
     )
 
 
@@ -135,6 +152,9 @@ def preop_edit(patient_id):
         patient.surgery_name = request.form.get("surgery_name")
 
         db.session.commit()
+        invalidate_counts()
+        invalidate_patient(patient.token)
+        invalidate_view(patient.id)
         flash("환자 정보가 수정되었습니다.", "success")
         return redirect(url_for("admin_preop.preop_list"))
 
@@ -143,10 +163,8 @@ def preop_edit(patient_id):
 @admin_preop_bp.route("/find_from_excel", methods=["POST"])
 @login_required
 def find_from_excel():
-    import pandas as pd
-    import re
-    from werkzeug.utils import secure_filename
-    import os
+    from app.admin_preop.excel_cache import get_parsed_workbook
+    from app.admin_preop.excel_normalize import normalize_pid, patient_from_row
 
     excel_file = request.files.get("excel_file")
     input_pid = request.form.get("patient_id", "").strip()
@@ -154,107 +172,47 @@ def find_from_excel():
     if not excel_file or not input_pid:
         return jsonify({"status": "error", "message": "파일 또는 등록번호가 없습니다."})
 
-    # ==============================
-    # 🔹 등록번호 정규화 함수
-    #    - 숫자만 남기고
-    #    - 앞의 0 제거
-    #    - 모두 0 또는 비면 "0"
-    # ==============================
-    def normalize_pid(v):
-        if v is None:
-            return ""
-        s = str(v).strip()
-        s = re.sub(r"\D", "", s)   # 숫자만 남기기
-        s = s.lstrip("0")          # 앞의 0 제거
-        return s or "0"
-
-    # 화면에 보여줄 때 9자리 0패딩용
-    def format_pid9(v):
-        return normalize_pid(v).zfill(9)
+    search_key = normalize_pid(input_pid)
 
     # ------------------------------
-    # 1) 파일 임시 저장
+    # 🔹 스트리밍 모드: pandas 없이 한 줄씩 읽음 (찾는 순서는 아래 pandas 모드와 같음)
     # ------------------------------
-    filename = secure_filename(excel_file.filename)
-    temp_path = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
-    excel_file.save(temp_path)
+    if current_app.config.get("EXCEL_READER") == "stream":
+        from app.admin_preop.excel_stream import find_patient
+
+        try:
+            patient_data = find_patient(excel_file.stream, search_key)
+        except Exception as e:
+            return jsonify({"status": "error", "message": f"엑셀 파일을 읽을 수 없습니다: {str(e)}"})
+
+        if patient_data is None:
+            return jsonify({"status": "error", "message": "등록번호를 포함한 열을 찾을 수 없습니다."})
+
+        return jsonify({"status": "success", "patient": patient_data})
 
     # ------------------------------
-    # 2) 엑셀 읽기
+    # 1) 엑셀 읽기 (같은 파일이면 캐시 사용)
     # ------------------------------
     try:
-        # 전부 문자열로 읽기
-        df = pd.read_excel(temp_path, header=None, dtype=str)
+        workbook = get_parsed_workbook(excel_file)
     except Exception as e:
         return jsonify({"status": "error", "message": f"엑셀 파일을 읽을 수 없습니다: {str(e)}"})
-
-    # 🔥 모든 셀 앞뒤 공백 제거
-    df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+    note_patients(len(workbook.df))
 
     # ------------------------------
-    # 3) 등록번호 열 찾기 (정규화해서 비교)
+    # 2) 등록번호로 열/행 찾기 (정규화 기준, 미리 만든 인덱스)
     # ------------------------------
-    search_key = normalize_pid(input_pid)
-    pid_col = None
+    hit = workbook.lookup(search_key)
 
-    for col in df.columns:
-        if df[col].apply(lambda x: normalize_pid(x) == search_key).any():
-            pid_col = col
-            break
-
-    if pid_col is None:
+    if hit is None:
         return jsonify({"status": "error", "message": "등록번호를 포함한 열을 찾을 수 없습니다."})
 
-    # ------------------------------
-    # 4) 등록번호로 행 찾기 (정규화 기준)
-    # ------------------------------
-    df["_norm_pid"] = df[pid_col].apply(normalize_pid)
-    row = df[df["_norm_pid"] == search_key]
-
-    if row.empty:
-        return jsonify({"status": "error", "message": f"[{input_pid}] 등록번호를 찾을 수 없습니다."})
-
-    r = row.iloc[0]
-    print("🔍 READ ROW:", r.to_dict())
-
-    # 안전 문자열 처리
-    def safe(v):
-        return "" if pd.isna(v) else str(v).strip()
-
-    # 🔥 날짜만 뽑아내는 함수 (YYYY-MM-DD)
-    def extract_date(v):
-        v = safe(v)
-        m = re.search(r"\d{4}-\d{2}-\d{2}", v)
-        return m.group(0) if m else ""
-    
-    # 🔥 나이만 숫자로 뽑기
-    def extract_age(v):
-        v = safe(v)
-        m = re.search(r"\d+", v)
-        return m.group(0) if m else ""
-
-    # index는 행의 실제 길이에 따라 보정
-    def get_col(idx):
-        try:
-            return safe(r[idx])
-        except Exception:
-            return ""
+    pid_col, r = hit
 
     # ------------------------------
-    # 5) 나머지 값 매핑 (엑셀 구조 그대로)
-    #    ※ 인덱스는 기존 코드 유지
+    # 3) 나머지 값 매핑 (엑셀 구조 그대로)
     # ------------------------------
-    patient_data = {
-        "surgery_date": extract_date(get_col(5)),
-        # 🔵 엑셀에 있는 원본 값에서 9자리로 포맷
-        "patient_id": format_pid9(r[pid_col]),
-        "name": get_col(8),
-        "gender": get_col(9),
-        "age": extract_age(get_col(10)),
-        "surgery_name": get_col(12),
-        "doctor_name": get_col(13),
-        "phone": get_col(30),
-    }
+    patient_data = patient_from_row(r, pid_col)
 
     return jsonify({"status": "success", "patient": patient_data})
 
@@ -287,6 +245,7 @@ def preop_create_excel_submit():
 
     db.session.add(patient)
     db.session.commit()
+    invalidate_counts()
 
     flash("환자가 등록되었습니다!", "success")
     return redirect(url_for("admin_preop.preop_list"))
@@ -297,98 +256,40 @@ def parse_excel_gen():
     if not (current_user.is_admin or current_user.is_superadmin):
         return jsonify({"status": "error", "message": "권한이 없습니다."}), 403
 
-    import pandas as pd
-    import re
-    from werkzeug.utils import secure_filename
-    import os
+    from app.admin_preop.excel_cache import get_parsed_workbook
+    from app.admin_preop.excel_normalize import MissingColumnError, gen_patients
 
     excel_file = request.files.get("excel_file")
     if not excel_file:
         return jsonify({"status": "error", "message": "엑셀 파일이 필요합니다."})
 
-    # 1) 파일 저장
-    filename = secure_filename(excel_file.filename)
-    temp_path = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
-    excel_file.save(temp_path)
-
-    # 2) 엑셀 읽기
+    # 🔵 15번 열(인덱스 14)이 "Gen" 인 행만 → 미리보기용 dict 리스트
     try:
-        df = pd.read_excel(temp_path, header=None, dtype=str)
-    except Exception as e:
+        if current_app.config.get("EXCEL_READER") == "stream":
+            # 스트리밍 모드: 필요한 열만 한 줄씩 (pandas 사용 안 함)
+            from app.admin_preop.excel_stream import gen_patients as stream_gen_patients
+            patients = stream_gen_patients(excel_file.stream)
+        else:
+            # 엑셀 읽기 (같은 파일이면 캐시 사용)
+            patients = gen_patients(get_parsed_workbook(excel_file).df)
+    except MissingColumnError:
         return jsonify({
             "status": "error",
-            "message": f"엑셀 파일을 읽을 수 없습니다: {e}"
+            "message": "엑셀에 15번째 열(Gen 열)이 없습니다. 열 위치를 확인해주세요."
         })
-
-    # 공백 제거
-    df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-
-    # 유틸 함수들
-    def safe(v):
-        return "" if pd.isna(v) else str(v).strip()
-
-    def extract_date(v):
-        v = safe(v)
-        m = re.search(r"\d{4}-\d{2}-\d{2}", v)
-        return m.group(0) if m else ""
-
-    def extract_age(v):
-        v = safe(v)
-        m = re.search(r"\d+", v)
-        return m.group(0) if m else ""
-
-    def normalize_pid(v):
-        if v is None:
-            return ""
-        s = re.sub(r"\D", "", str(v))
-        s = s.lstrip("0")
-        return s or "0"
-
-    def pid9(v):
-        return normalize_pid(v).zfill(9)
-
-    # 🔵 15번 열(인덱스 14)이 "Gen" 인 행만 선택
-    try:
-        gen_rows = df[df[14].apply(lambda x: safe(x) == "Gen")]
-    except KeyError:
+    except Exception as e:
         return jsonify({
             "status": "error",
-            "message": "엑셀에 15번째 열(Gen 열)이 없습니다. 열 위치를 확인해주세요."
+            "message": f"엑셀 파일을 읽을 수 없습니다: {e}"
         })
 
-    if gen_rows.empty:
+    note_patients(len(patients))
+    if not patients:
         return jsonify({
             "status": "error",
             "message": '15번 열이 "Gen"인 환자를 찾을 수 없습니다.'
         })
 
-    patients = []
-
-    # 행들을 미리보기용 dict 리스트로 변환
-    for _, r in gen_rows.iterrows():
-        surgery_date = extract_date(r[5])   # 6번째 열: 수술 날짜
-        patient_id   = pid9(r[7])           # 8번째 열(H): 등록번호
-        name         = safe(r[8])           # 9번째 열(I): 이름
-        gender       = safe(r[9])           # 10번째 열(J): 성별
-        age          = extract_age(r[10])   # 11번째 열(K): 나이
-        surgery_name = safe(r[12])          # 13번째 열(M): 수술명
-        doctor_name  = safe(r[13])          # 14번째 열(N): 주치의
-        phone        = safe(r[30])          # 31번째 열(AF): 전화번호
-
-        if not patient_id or not name:
-            continue
-
-        patients.append({
-            "surgery_date": surgery_date,
-            "patient_id":   patient_id,
-            "name":         name,
-            "gender":       gender,
-            "age":          age,
-            "surgery_name": surgery_name,
-            "doctor_name":  doctor_name,
-            "phone":        phone,
-        })
-
     return jsonify({"status": "success", "patients": patients})
 
 @admin_preop_bp.route("/create_excel_multi", methods=["POST"])
@@ -404,48 +305,70 @@ def preop_create_excel_multi():
     if not isinstance(patients, list) or not patients:
         return jsonify({"status": "error", "message": "등록할 환자 데이터가 없습니다."})
 
-    count = 0
-
-    for p in patients:
-        surgery_date = p.get("surgery_date")
-        patient_id   = p.get("patient_id")
-        name         = p.get("name")
-        gender       = p.get("gender")
-        age          = p.get("age")
-        surgery_name = p.get("surgery_name")
-        doctor_name  = p.get("doctor_name")
-        phone        = p.get("phone")
-
-        if not patient_id or not name:
-            continue
-
-        # 중복 방지: 같은 수술일 + 등록번호가 이미 있으면 건너뜀
-        existing = PreOpPatient.query.filter_by(
-            patient_id=patient_id,
-            surgery_date=surgery_date,
-        ).first()
-        if existing:
-            continue
-
-        patient = PreOpPatient(
-            name=name,
-            patient_id=patient_id,
-            age=age,
-            phone=phone,
-            doctor_name=doctor_name,
-            surgery_date=surgery_date,
-            gender=gender,
-            surgery_name=surgery_name,
-            token=uuid.uuid4().hex,
-        )
-        db.session.add(patient)
-        count += 1
+    from app.admin_preop.importer import import_patients
 
-    db.session.commit()
+    # 기존 (등록번호, 수술일) 조회 1번 + bulk insert 1번
+    note_patients(len(patients))
+    results = import_patients(patients)
+    count = sum(1 for r in results if r["status"] == "inserted")
+    invalidate_counts()
 
     return jsonify({
         "status": "success",
         "count": count,
+        "duplicates": sum(1 for r in results if r["status"] == "duplicate"),
+        "invalid": sum(1 for r in results if r["status"] == "invalid"),
+        "results": results,
+        "redirect_url": url_for("admin_preop.preop_list"),
+    })
+
+
+# ===========================================
+# 관리자용: 스케줄 엑셀 재업로드 (바뀐 것만 반영)
+# body: { "patients": [...], "apply": false }
+#  - apply=false : 변경 내역만 반환 (미리보기)
+#  - apply=true  : 신규/수정/취소 해제/취소 표시를 한 트랜잭션으로 반영
+# ===========================================
+@admin_preop_bp.route("/reimport", methods=["POST"])
+@login_required
+def preop_reimport():
+    if not (current_user.is_admin or current_user.is_superadmin):
+        return jsonify({"status": "error", "message": "권한이 없습니다."}), 403
+
+    data = request.get_json(silent=True) or {}
+    patients = data.get("patients") or []
+
+    if not isinstance(patients, list) or not patients:
+        return jsonify({"status": "error", "message": "비교할 환자 데이터가 없습니다."})
+
+    from app.admin_preop.importer import apply_schedule_changes, diff_schedule
+
+    note_patients(len(patients))
+    changes = diff_schedule(patients)
+    summary = {
+        "inserts": len(changes["inserts"]),
+        "updates": len(changes["updates"]),
+        "restores": len(changes["restores"]),
+        "cancels": len(changes["cancels"]),
+        "protected": len(changes["protected"]),
+        "unchanged": changes["unchanged"],
+        "invalid": changes["invalid"],
+    }
+
+    if not data.get("apply"):
+        return jsonify({"status": "success", "applied": False, "summary": summary, "changes": changes})
+
+    cancelled_ids = apply_schedule_changes(changes)
+    invalidate_counts()
+    invalidate_patient()
+    invalidate_view()
+    summary["cancelled"] = len(cancelled_ids)
+
+    return jsonify({
+        "status": "success",
+        "applied": True,
+        "summary": summary,
+        "changes": changes,
         "redirect_url": url_for("admin_preop.preop_list"),
     })
 
@@ -468,49 +391,23 @@ def preop_delete(patient_id):
     patient = PreOpPatient.query.get_or_404(patient_id)
 
     # 삭제
+    token = patient.token
     db.session.delete(patient)
     db.session.commit()
+    invalidate_counts()
+    invalidate_patient(token)
+    invalidate_view(patient_id)
 
     return jsonify({"status": "success", "message": "삭제되었습니다."})
 
 # ===========================================
 # ✅ 알리고(SmartSMS) 문자 전송 유틸
 # ===========================================
-def _norm_phone(p: str) -> str:
-    return re.sub(r"[^0-9]", "", p or "")
-
+@timed_external("aligo_send", ok=lambda r: r[0] == 200)
 def _send_aligo_sms(to_phone: str, msg: str):
-    """
-    환경변수 필요:
-      ALIGO_USER_ID, ALIGO_API_KEY, ALIGO_SENDER
-    선택:
-      ALIGO_TESTMODE=Y  (테스트 모드)
-    """
-    user_id = os.environ.get("ALIGO_USER_ID", "").strip()
-    api_key = os.environ.get("ALIGO_API_KEY", "").strip()
-    sender  = os.environ.get("ALIGO_SENDER", "").strip()
-    testmode = os.environ.get("ALIGO_TESTMODE", "").strip().upper() == "Y"
-
-    if not user_id or not api_key or not sender:
-        return 500, {"error": "알리고 환경변수(ALIGO_USER_ID / ALIGO_API_KEY / ALIGO_SENDER)가 설정되지 않았습니다."}
-
-    payload = {
-        "key": api_key,
-        "user_id": user_id,
-        "sender": _norm_phone(sender),
-        "receiver": _norm_phone(to_phone),
-        "msg": msg,
-        "testmode_yn": "Y" if testmode else "N",
-    }
-
-    try:
-        r = requests.post("https://apis.aligo.in/send/", data=payload, timeout=10)
-        try:
-            return r.status_code, r.json()
-        except Exception:
-            return r.status_code, {"raw": r.text}
-    except Exception as e:
-        return 500, {"error": f"알리고 요청 실패: {str(e)}"}
+    """1명 전송 → (HTTP 상태, 응답). 실제 전송은 app/admin_preop/sms.py (SMS_TRANSPORT)"""
+    from app.admin_preop.sms import get_transport
+    return get_transport().send(to_phone, msg)
 
 # ===========================================
 # ✅ 문자 전송 API (프론트에서 fetch로 호출)
@@ -557,3 +454,199 @@ def preop_send_sms(patient_id):
     return jsonify({"status": "success", "message": "문자가 전송되었습니다.", "aligo": resp}), 200
 
 
+# ===========================================
+# ✅ 일괄 문자 (수술일 전체 또는 선택한 환자)
+# POST /admin/preop/sms/campaign
+# body: { "date": "YYYY-MM-DD" 또는 "patient_ids": [...],
+#         "template": "{name}님 ... {link}", "resend": false }
+# → 백그라운드 전송, GET /admin/preop/sms/campaign/<id> 로 진행 상황 확인
+# ===========================================
+@admin_preop_bp.route("/sms/campaign", methods=["POST"])
+@login_required
+def preop_sms_campaign():
+
+    if not (current_user.is_admin or current_user.is_superadmin):
+        return jsonify({"status": "error", "message": "권한이 없습니다."}), 403
+
+    from app.admin_preop.sms import campaign_recipients, check_template, start_campaign
+
+    data = request.get_json(silent=True) or {}
+    date_str = (data.get("date") or "").strip()
+    patient_ids = data.get("patient_ids") or []
+    template = (data.get("template") or "").strip()
+
+    if not template:
+        return jsonify({"status": "error", "message": "메시지가 비어있습니다."}), 400
+
+    error = check_template(template)
+    if error:
+        return jsonify({"status": "error", "message": error}), 400
+
+    if not isinstance(patient_ids, list) or not all(isinstance(i, int) for i in patient_ids):
+        return jsonify({"status": "error", "message": "잘못된 환자 목록입니다."}), 400
+
+    if not patient_ids and not date_str:
+        return jsonify({"status": "error", "message": "수술 날짜 또는 환자를 선택하세요."}), 400
+
+    recipients = campaign_recipients(date_str, patient_ids, resend=bool(data.get("resend")))
+    if not recipients:
+        return jsonify({"status": "error", "message": "보낼 환자가 없습니다."}), 400
+
+    # 프록시(Render) 뒤에서는 PROXY_COUNT=1 로 ProxyFix 를 켜야 https 로 나옴 (create_app)
+    link_base = url_for("preop.start", token="", _external=True)
+    campaign = start_campaign(recipients, template, link_base)
+
+    return jsonify({"status": "success", "campaign": campaign}), 202
+
+
+@admin_preop_bp.route("/sms/campaign/<campaign_id>")
+@login_required
+def preop_sms_campaign_status(campaign_id):
+
+    if not (current_user.is_admin or current_user.is_superadmin):
+        return jsonify({"status": "error", "message": "권한이 없습니다."}), 403
+
+    from app.admin_preop.sms import get_campaign
+
+    campaign = get_campaign(campaign_id)
+    if campaign is None:
+        return jsonify({"status": "error", "message": "캠페인을 찾을 수 없습니다."}), 404
+
+    return jsonify({"status": "success", "campaign": campaign})
+
+
+# ===========================================
+# ✅ 문진 결과 내보내기 (CSV / XLSX)
+# GET  /admin/preop/export?format=xlsx&date=YYYY-MM-DD (또는 date_from / date_to)
+#                         &doctor=주치의&submitted=1   → 바로 다운로드 (스트리밍)
+# POST /admin/preop/export/jobs  body: 같은 값 (JSON)  → 백그라운드로 EXCEL_OUTPUT 에 생성
+# GET  /admin/preop/export/jobs/<id>                   → 진행 상황 + 다운로드 주소
+# ===========================================
+@admin_preop_bp.route("/export")
+@login_required
+def preop_export():
+
+    if not (current_user.is_admin or current_user.is_superadmin):
+        return "권한이 없습니다.", 403
+
+    from flask import Response, stream_with_context
+    from app.admin_preop.export import FORMATS, export_filename, export_filters, stream_export
+
+    fmt = request.args.get("format", "xlsx")
+    if fmt not in FORMATS:
+        return "format 은 csv 또는 xlsx 입니다.", 400
+
+    try:
+        filters = export_filters(request.args)
+    except ValueError as e:
+        return str(e), 400
+
+    mimetype = "text/csv" if fmt == "csv" else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    return Response(
+        stream_with_context(stream_export(filters, fmt)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={export_filename(filters, fmt)}"},
+    )
+
+
+@admin_preop_bp.route("/export/jobs", methods=["POST"])
+@login_required
+def preop_export_start():
+
+    if not (current_user.is_admin or current_user.is_superadmin):
+        return jsonify({"status": "error", "message": "권한이 없습니다."}), 403
+
+    from app.admin_preop.export import FORMATS, export_filters, start_export
+
+    data = request.get_json(silent=True) or {}
+    fmt = data.get("format", "xlsx")
+    if fmt not in FORMATS:
+        return jsonify({"status": "error", "message": "format 은 csv 또는 xlsx 입니다."}), 400
+
+    try:
+        filters = export_filters(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    job = start_export(filters, fmt)
+    return jsonify({"status": "success", "job": job}), 202
+
+
+@admin_preop_bp.route("/export/jobs/<job_id>")
+@login_required
+def preop_export_status(job_id):
+
+    if not (current_user.is_admin or current_user.is_superadmin):
+        return jsonify({"status": "error", "message": "권한이 없습니다."}), 403
+
+    from app.admin_preop.export import get_export
+
+    job = get_export(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "내보내기 작업을 찾을 수 없습니다."}), 404
+
+    if job["status"] == "done":
+        job["download_url"] = url_for("admin_preop.preop_export_download", filename=job["filename"])
+
+    return jsonify({"status": "success", "job": job})
+
+
+@admin_preop_bp.route("/export/files/<path:filename>")
+@login_required
+def preop_export_download(filename):
+
+    if not (current_user.is_admin or current_user.is_superadmin):
+        return "권한이 없습니다.", 403
+
+    from flask import send_from_directory
+    return send_from_directory(current_app.config["EXCEL_OUTPUT"], filename, as_attachment=True)
+
+
+# ===========================================
+# 관리자용: 요청 계측 (METRICS_ENABLED)
+#  - /metrics            : 표 (라우트별 p50/p95/p99, SQL, 외부 호출)
+#  - /metrics/reset      : POST 로만 초기화 (링크 미리 읽기 / 크롤러가 지우지 않도록)
+#  - /metrics/prometheus : Prometheus text (관리자 로그인 또는 METRICS_TOKEN)
+# ===========================================
+@admin_preop_bp.route("/metrics")
+@login_required
+def preop_metrics():
+    if not (current_user.is_admin or current_user.is_superadmin):
+        return "권한이 없습니다.", 403
+
+    from app.metrics import metrics_enabled, registry
+
+    return render_template(
+        "admin_preop/metrics.html",
+        enabled=metrics_enabled(),
+        metrics=registry.snapshot(),
+    )
+
+
+@admin_preop_bp.route("/metrics/reset", methods=["POST"])
+@login_required
+def preop_metrics_reset():
+    if not (current_user.is_admin or current_user.is_superadmin):
+        return "권한이 없습니다.", 403
+
+    from app.metrics import registry
+
+    registry.reset()
+    return redirect(url_for("admin_preop.preop_metrics"))
+
+
+@admin_preop_bp.route("/metrics/prometheus")
+def preop_metrics_prometheus():
+    from app.metrics import metrics_enabled, registry
+
+    token = current_app.config.get("METRICS_TOKEN")
+    by_token = token and request.headers.get("Authorization") == f"Bearer {token}"
+    by_login = current_user.is_authenticated and (current_user.is_admin or current_user.is_superadmin)
+    if not (by_token or by_login):
+        return "권한이 없습니다.", 403
+
+    if not metrics_enabled():
+        return "METRICS_ENABLED 가 꺼져 있습니다.", 404
+
+    return current_app.response_class(registry.prometheus(), mimetype="text/plain; version=0.0.4")
+
@@ -0,0 +1,56 @@
+from sqlalchemy import column, or_, text
+
+from app import db
+from app.models import PreOpPatient
+
+# ===========================================
+# 환자 검색 (관리자 리스트 q 파라미터)
+#  - SQLite + FTS5 trigram 인덱스가 있으면 인덱스로 부분 일치 검색
+#  - 3글자 미만(트라이그램 불가) 이거나 인덱스가 없으면 기존 LIKE 검색
+# ===========================================
+
+FTS_TABLE = "preop_patients_fts"
+MIN_TRIGRAM_LEN = 3
+
+_fts_available = {}
+
+
+def fts_available():
+    """현재 DB 에 FTS 테이블이 있는지 (엔진별로 한 번만 확인)"""
+    engine = db.engine
+    if engine not in _fts_available:
+        if engine.dialect.name != "sqlite":
+            _fts_available[engine] = False
+        else:
+            row = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"), {"n": FTS_TABLE}
+            ).first()
+            _fts_available[engine] = row is not None
+    return _fts_available[engine]
+
+
+def fts_phrase(q):
+    """검색어 전체를 하나의 구문으로 (LIKE '%q%' 와 같은 부분 일치)"""
+    return '"' + q.replace('"', '""') + '"'
+
+
+def like_filter(q):
+    return or_(
+        PreOpPatient.name.like(f"%{q}%"),
+        PreOpPatient.patient_id.like(f"%{q}%"),
+        PreOpPatient.phone.like(f"%{q}%"),
+        PreOpPatient.doctor_name.like(f"%{q}%"),
+        PreOpPatient.surgery_name.like(f"%{q}%"),
+    )
+
+
+def patient_search_filter(q):
+    """검색어 → PreOpPatient 필터 조건"""
+    if len(q) < MIN_TRIGRAM_LEN or not fts_available():
+        return like_filter(q)
+
+    matches = text(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :phrase"
+    ).bindparams(phrase=fts_phrase(q)).columns(column("rowid"))
+
+    return PreOpPatient.id.in_(matches)
@@ -0,0 +1,361 @@
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from sqlalchemy import select, update
+
+from app import db
+from app.job_state import load_job, prune_jobs, save_job
+from app.metrics import timed_external
+from app.models import PreOpPatient
+
+# ===========================================
+# 문자 전송 (알리고)
+#  - AligoTransport : keep-alive 세션 재사용, 대량은 /send_mass/ (요청 1번에 최대 500명)
+#                     일부 실패한 묶음은 /sms_list/ 로 수신자별 결과 조회
+#  - StubTransport  : 실제로 보내지 않고 메모리에 기록 (로컬 테스트용)
+#  - SMS_TRANSPORT 환경변수로 선택 ("aligo" 기본 / "stub")
+# ===========================================
+
+ALIGO_SEND_URL = "https://apis.aligo.in/send/"
+ALIGO_MASS_URL = "https://apis.aligo.in/send_mass/"
+ALIGO_LIST_URL = "https://apis.aligo.in/sms_list/"
+DELIVERED_STATES = ("발송완료",)   # sms_list 의 sms_state 중 전송 완료로 보는 값
+MASS_LIMIT = 500          # 알리고 send_mass 한 번에 보낼 수 있는 최대 수신자 수
+SMS_MAX_BYTES = 90        # 이보다 길면 LMS
+
+
+def norm_phone(p):
+    return re.sub(r"[^0-9]", "", p or "")
+
+
+def message_type(msg):
+    """EUC-KR 기준 90바이트 이하면 SMS, 넘으면 LMS"""
+    return "SMS" if len(msg.encode("euc-kr", errors="replace")) <= SMS_MAX_BYTES else "LMS"
+
+
+class AligoTransport:
+    """
+    환경변수 필요:
+      ALIGO_USER_ID, ALIGO_API_KEY, ALIGO_SENDER
+    선택:
+      ALIGO_TESTMODE=Y  (테스트 모드)
+    """
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+    def _credentials(self):
+        user_id = os.environ.get("ALIGO_USER_ID", "").strip()
+        api_key = os.environ.get("ALIGO_API_KEY", "").strip()
+        sender = os.environ.get("ALIGO_SENDER", "").strip()
+        testmode = os.environ.get("ALIGO_TESTMODE", "").strip().upper() == "Y"
+
+        if not user_id or not api_key or not sender:
+            return None
+
+        return {
+            "key": api_key,
+            "user_id": user_id,
+            "sender": norm_phone(sender),
+            "testmode_yn": "Y" if testmode else "N",
+        }
+
+    def _post(self, url, payload):
+        try:
+            r = self.session.post(url, data=payload, timeout=10)
+            try:
+                return r.status_code, r.json()
+            except Exception:
+                return r.status_code, {"raw": r.text}
+        except Exception as e:
+            return 500, {"error": f"알리고 요청 실패: {str(e)}"}
+
+    def send(self, to_phone, msg):
+        """1명에게 전송 → (HTTP 상태, 응답 dict)"""
+        creds = self._credentials()
+        if creds is None:
+            return 500, {"error": "알리고 환경변수(ALIGO_USER_ID / ALIGO_API_KEY / ALIGO_SENDER)가 설정되지 않았습니다."}
+
+        return self._post(ALIGO_SEND_URL, dict(creds, receiver=norm_phone(to_phone), msg=msg))
+
+    def send_mass(self, messages, msg_type):
+        """[(전화, 메시지), ...] (최대 500개, 같은 msg_type) → (HTTP 상태, 응답 dict)"""
+        creds = self._credentials()
+        if creds is None:
+            return 500, {"error": "알리고 환경변수(ALIGO_USER_ID / ALIGO_API_KEY / ALIGO_SENDER)가 설정되지 않았습니다."}
+
+        payload = dict(creds, cnt=len(messages), msg_type=msg_type)
+        for i, (phone, msg) in enumerate(messages, start=1):
+            payload[f"rec_{i}"] = norm_phone(phone)
+            payload[f"msg_{i}"] = msg
+
+        return self._post(ALIGO_MASS_URL, payload)
+
+    def delivered(self, msg_id):
+        """send_mass 응답의 msg_id → 전송 완료로 확인된 수신 번호 set (조회 실패면 None)"""
+        creds = self._credentials()
+        if creds is None:
+            return None
+
+        phones = set()
+        page = 1
+        while True:
+            status_code, resp = self._post(ALIGO_LIST_URL, {
+                "key": creds["key"],
+                "user_id": creds["user_id"],
+                "mid": msg_id,
+                "page": page,
+                "page_size": MASS_LIMIT,
+            })
+            if not is_success(status_code, resp):
+                return None
+
+            for item in resp.get("list") or []:
+                if item.get("sms_state") in DELIVERED_STATES:
+                    phones.add(norm_phone(item.get("receiver")))
+
+            if resp.get("next_yn") != "Y":
+                return phones
+            page += 1
+
+
+class StubTransport:
+    """보낸 것처럼 응답만 만들고 sent 에 기록"""
+
+    def __init__(self):
+        self.sent = []
+        self.results = {}       # msg_id → 받은 번호 set
+        self._lock = threading.Lock()
+
+    def send(self, to_phone, msg):
+        with self._lock:
+            self.sent.append((norm_phone(to_phone), msg))
+        return 200, {"result_code": "1", "message": "success (stub)"}
+
+    def send_mass(self, messages, msg_type):
+        msg_id = uuid.uuid4().hex
+        with self._lock:
+            self.sent.extend((norm_phone(p), m) for p, m in messages)
+            self.results[msg_id] = {norm_phone(p) for p, _ in messages}
+        return 200, {
+            "result_code": "1",
+            "message": "success (stub)",
+            "msg_id": msg_id,
+            "success_cnt": len(messages),
+            "error_cnt": 0,
+            "msg_type": msg_type,
+        }
+
+    def delivered(self, msg_id):
+        with self._lock:
+            return set(self.results.get(msg_id, ()))
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport():
+    """SMS_TRANSPORT 설정에 맞는 전송기 (프로세스당 1개, 세션 재사용)"""
+    name = current_app.config.get("SMS_TRANSPORT", "aligo")
+    with _transports_lock:
+        if name not in _transports:
+            _transports[name] = StubTransport() if name == "stub" else AligoTransport()
+        return _transports[name]
+
+
+def is_success(status_code, resp):
+    # 알리고는 HTTP 200 에 result_code 로 실패를 알려주는 경우가 있음
+    return status_code == 200 and not (
+        isinstance(resp, dict) and resp.get("result_code") not in (None, "1", 1)
+    )
+
+
+# ===========================================
+# 수술일 단위 일괄 문자 (캠페인)
+#  - 메시지 템플릿: {name} {link} {token} {surgery_date} {doctor_name}
+#  - 백그라운드 스레드에서 500명씩 send_mass, 성공한 배치는 sms_sent 일괄 갱신
+#  - 일부 실패한 배치는 수신자별 결과를 조회해서 전송 완료가 확인된 환자만 표시
+#    (확인 안 된 환자만 다음 캠페인 대상 → 받은 환자에게 같은 문자가 두 번 가지 않도록)
+#  - 진행 상황은 STORAGE_ROOT/sms_campaigns/<id>.json (어느 워커에서든 GET /sms/campaign/<id>)
+# ===========================================
+TEMPLATE_FIELDS = ("name", "link", "token", "surgery_date", "doctor_name")
+KEEP_CAMPAIGNS = 20
+DELIVERY_CHECKS = 3          # 일부 실패 묶음의 결과 조회 횟수 (아직 전송 중인 번호가 있을 수 있음)
+DELIVERY_CHECK_DELAY = 5     # 조회 간격 (초)
+
+
+def _campaign_folder(app=None):
+    return os.path.join((app or current_app).config["STORAGE_ROOT"], "sms_campaigns")
+
+
+def render_message(template, patient, link_base):
+    return template.format(
+        name=patient["name"],
+        link=f"{link_base}{patient['token']}",
+        token=patient["token"],
+        surgery_date=patient["surgery_date"],
+        doctor_name=patient["doctor_name"] or "",
+    )
+
+
+def check_template(template):
+    """템플릿 오류 메시지 (문제 없으면 None)"""
+    try:
+        template.format(**{f: "" for f in TEMPLATE_FIELDS})
+    except (KeyError, IndexError, ValueError) as e:
+        return f"메시지 템플릿 오류: {e}"
+    return None
+
+
+def campaign_recipients(date=None, patient_ids=None, resend=False):
+    """대상 환자 (전화번호 있고 취소되지 않은 환자만, resend 가 아니면 이미 보낸 환자 제외)"""
+    query = select(
+        PreOpPatient.id, PreOpPatient.name, PreOpPatient.phone, PreOpPatient.token,
+        PreOpPatient.surgery_date, PreOpPatient.doctor_name,
+    ).where(PreOpPatient.phone != "", PreOpPatient.cancelled_at.is_(None))
+
+    if patient_ids:
+        query = query.where(PreOpPatient.id.in_(patient_ids))
+    else:
+        query = query.where(PreOpPatient.surgery_date == date)
+
+    if not resend:
+        query = query.where(PreOpPatient.sms_sent.is_not(True))
+
+    return db.session.execute(query.order_by(PreOpPatient.name, PreOpPatient.id)).mappings().all()
+
+
+def start_campaign(recipients, template, link_base):
+    """캠페인 시작 → 상태 dict (백그라운드에서 전송)"""
+    campaign = {
+        "id": uuid.uuid4().hex,
+        "status": "running",
+        "total": len(recipients),
+        "sent": 0,
+        "failed": 0,
+        "partial": 0,       # 일부 실패한 묶음에서 전송 완료를 확인하지 못한 환자 수 (전송 완료 표시 안 함)
+        "errors": [],
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "finished_at": None,
+    }
+    folder = _campaign_folder()
+    save_job(folder, campaign)
+    # 오래된 캠페인 상태는 최근 KEEP_CAMPAIGNS 개만 보관
+    prune_jobs(folder, KEEP_CAMPAIGNS)
+
+    messages = [
+        (r["id"], r["phone"], render_message(template, r, link_base))
+        for r in recipients
+    ]
+
+    app = current_app._get_current_object()
+    threading.Thread(
+        target=_run_campaign,
+        args=(app, campaign, messages),
+        name=f"sms-campaign-{campaign['id'][:8]}",
+        daemon=True,
+    ).start()
+
+    return dict(campaign, errors=list(campaign["errors"]))
+
+
+def get_campaign(campaign_id):
+    return load_job(_campaign_folder(), campaign_id)
+
+
+def _batches(messages):
+    # send_mass 는 요청마다 msg_type 이 하나 → SMS / LMS 따로 500개씩
+    by_type = {}
+    for m in messages:
+        by_type.setdefault(message_type(m[2]), []).append(m)
+
+    for msg_type, items in by_type.items():
+        for i in range(0, len(items), MASS_LIMIT):
+            yield msg_type, items[i:i + MASS_LIMIT]
+
+
+def _run_campaign(app, campaign, messages):
+    with app.app_context():
+        folder = _campaign_folder(app)
+        transport = get_transport()
+        send_mass = timed_external("aligo_send_mass", ok=lambda r: is_success(*r))(transport.send_mass)
+        delivered = timed_external("aligo_sms_list", ok=lambda r: r is not None)(transport.delivered)
+        try:
+            for msg_type, batch in _batches(messages):
+                _send_batch(campaign, send_mass, delivered, msg_type, batch)
+                save_job(folder, campaign)   # 묶음마다 진행 상황 기록
+
+            campaign["status"] = "done"
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception("[SMS] 캠페인 실패")
+            campaign["status"] = "failed"
+            campaign["errors"].append(str(e))
+        finally:
+            campaign["finished_at"] = datetime.now().isoformat(timespec="seconds")
+            save_job(folder, campaign)
+
+
+def _send_batch(campaign, send_mass, delivered, msg_type, batch):
+    status_code, resp = send_mass([(phone, msg) for _, phone, msg in batch], msg_type)
+
+    if not is_success(status_code, resp):
+        campaign["failed"] += len(batch)
+        campaign["errors"].append(resp.get("message") or resp.get("error") or f"HTTP {status_code}")
+        return
+
+    errors = int(resp.get("error_cnt") or 0)
+    if not errors:
+        _mark_sent([pid for pid, _, _ in batch])
+        campaign["sent"] += len(batch)
+        return
+
+    # send_mass 응답에는 실패한 수신자 목록이 없음 → msg_id 로 수신자별 결과를 조회해서
+    # 전송 완료가 확인된 환자만 표시 (조회가 안 되면 아무도 표시하지 않음)
+    phones = _confirmed_phones(delivered, resp.get("msg_id"), len(batch) - errors)
+    confirmed = [pid for pid, phone, _ in batch if norm_phone(phone) in phones]
+    _mark_sent(confirmed)
+
+    campaign["sent"] += len(batch) - errors
+    campaign["failed"] += errors
+    campaign["partial"] += len(batch) - len(confirmed)
+    campaign["errors"].append(
+        f"{len(batch)}건 중 {errors}건 실패 → 전송 확인된 {len(confirmed)}명만 완료로 표시"
+    )
+
+
+def _confirmed_phones(delivered, msg_id, expected):
+    """전송 완료로 확인된 번호 (expected 개가 확인될 때까지 DELIVERY_CHECKS 번 조회)"""
+    phones = set()
+    if not msg_id:
+        return phones
+
+    for i in range(DELIVERY_CHECKS):
+        if i:
+            time.sleep(DELIVERY_CHECK_DELAY)
+        result = delivered(msg_id)
+        if result is not None:
+            phones = result
+        if len(phones) >= expected:
+            break
+    return phones
+
+
+def _mark_sent(patient_ids):
+    if not patient_ids:
+        return
+    now = datetime.now()
+    db.session.execute(
+        update(PreOpPatient),
+        [{"id": pid, "sms_sent": True, "sms_sent_at": now} for pid in patient_ids],
+    )
+    db.session.commit()
@@ -0,0 +1,43 @@
+import os
+import threading
+import time
+
+# ===========================================
+# 워커 프로세스별 주기 작업 (daemon 스레드)
+#  - 프로세스(pid)마다 한 번만 시작 → gunicorn fork 이후에도 안전
+# ===========================================
+_started = set()
+_lock = threading.Lock()
+
+
+def start_periodic(app, name, interval, func):
+    """interval 초마다 app context 안에서 func() 실행 (interval 이 0 이면 안 함)"""
+    if not interval:
+        return
+
+    key = (name, os.getpid())
+    if key in _started:
+        return
+
+    with _lock:
+        if key in _started:
+            return
+        _started.add(key)
+
+    t = threading.Thread(
+        target=_run_periodic,
+        args=(app, name, interval, func),
+        name=f"bg-{name}",
+        daemon=True,
+    )
+    t.start()
+
+
+def _run_periodic(app, name, interval, func):
+    while True:
+        try:
+            with app.app_context():
+                func()
+        except Exception:
+            app.logger.exception(f"[BACKGROUND] {name} 실패")
+        time.sleep(interval)
@@ -0,0 +1,85 @@
+import os
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+
+try:
+    import fcntl
+except ImportError:      # Windows: 파일 잠금 없이 진행
+    fcntl = None
+
+# ===========================================
+# DB 초기화 (테이블 생성 + 마이그레이션 + 기본 관리자)
+#  - 배포 시 한 번: python scripts/bootstrap.py (Procfile 에서 gunicorn 전에 실행)
+#  - 워커 시작 시에는 스키마 버전만 읽어서 확인 (SELECT 1번)
+#  - 버전이 뒤처져 있으면 DB_BOOTSTRAP 에 따라
+#      "auto"  (기본) : 파일 잠금을 잡고 직접 초기화 (로컬 실행 / 새 DB)
+#      "check"        : 경고만 출력
+#      "skip"         : 확인도 안 함 (scripts/bootstrap.py 자신)
+#  - 워커 여러 개가 동시에 떠도 STORAGE_ROOT/.bootstrap.lock 으로 한 번만 실행
+# ===========================================
+
+
+def schema_version(engine=None):
+    """schema_migrations 의 최신 버전 (테이블이 없으면 0). 읽기 전용"""
+    engine = engine or db.engine
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar() or 0
+    except DBAPIError:
+        return 0
+
+
+@contextmanager
+def bootstrap_lock(app):
+    """같은 서버의 다른 프로세스와 초기화가 겹치지 않도록 파일 잠금"""
+    if fcntl is None:
+        yield
+        return
+
+    path = os.path.join(app.config["STORAGE_ROOT"], ".bootstrap.lock")
+    with open(path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def bootstrap_database(log=print):
+    """테이블 생성 + 마이그레이션 + 기본 관리자 (여러 번 실행해도 안전)"""
+    from flask import current_app
+
+    from app import models  # noqa: F401  (create_all 전에 모델 등록)
+    from app.admin_init import create_default_admin
+    from app.migrations import run_migrations
+    from app.sqlite_profile import report_sqlite_settings
+
+    db.create_all()
+    run_migrations(log=log)
+    create_default_admin()
+
+    # 실제 적용된 SQLite 설정 로그
+    report_sqlite_settings(current_app)
+
+
+def ensure_database(app):
+    """워커 시작 시 호출 (app context 안). 최신이면 SELECT 1번으로 끝"""
+    from app.migrations import LATEST_VERSION
+
+    if schema_version() >= LATEST_VERSION:
+        return
+
+    if app.config["DB_BOOTSTRAP"] != "auto":
+        app.logger.warning(
+            f"[BOOTSTRAP] 스키마 버전이 최신({LATEST_VERSION})이 아닙니다. python scripts/bootstrap.py 를 실행하세요."
+        )
+        return
+
+    with bootstrap_lock(app):
+        # 잠금을 기다리는 동안 다른 워커가 끝냈을 수 있음
+        if schema_version() < LATEST_VERSION:
+            bootstrap_database()
@@ -0,0 +1,58 @@
+from sqlalchemy.engine import make_url
+
+# ===========================================
+# DB 접속 설정 (환경변수)
+#  - DATABASE_URL 이 있으면 그 DB 사용 (예: PostgreSQL), 없으면 STORAGE_ROOT/database.db
+#  - 커넥션 풀: DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT / DB_POOL_RECYCLE / DB_POOL_PRE_PING
+# ===========================================
+
+# SQLite 가 아닌 DB(여러 인스턴스가 같이 쓰는 서버 DB) 기본 풀 설정
+SERVER_POOL_DEFAULTS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,   # 초, 서버/프록시가 오래된 커넥션을 끊는 경우 대비
+    "pool_pre_ping": True,
+}
+
+POOL_ENV = {
+    "pool_size": ("DB_POOL_SIZE", int),
+    "max_overflow": ("DB_MAX_OVERFLOW", int),
+    "pool_timeout": ("DB_POOL_TIMEOUT", int),
+    "pool_recycle": ("DB_POOL_RECYCLE", int),
+    "pool_pre_ping": ("DB_POOL_PRE_PING", lambda v: v.strip().lower() in ("1", "true", "y", "yes")),
+}
+
+
+def database_url(url, default_sqlite_path):
+    """접속 URL 정리 (Heroku/Render 식 postgres:// → postgresql://)"""
+    if not url:
+        return f"sqlite:///{default_sqlite_path}"
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def engine_options(url, environ):
+    """SQLALCHEMY_ENGINE_OPTIONS 생성
+
+    SQLite 는 파일 하나 + 프로세스 내 풀이라 환경변수로 지정한 값만 넘기고,
+    서버 DB 는 SERVER_POOL_DEFAULTS 위에 환경변수 값을 덮어쓴다.
+    """
+    options = {} if is_sqlite(url) else dict(SERVER_POOL_DEFAULTS)
+
+    for key, (env, cast) in POOL_ENV.items():
+        raw = environ.get(env)
+        if raw not in (None, ""):
+            options[key] = cast(raw)
+
+    # 메모리 SQLite(SingletonThreadPool) 는 풀 크기 옵션을 받지 않음
+    if is_sqlite(url) and make_url(url).database in (None, "", ":memory:"):
+        for key in ("pool_size", "max_overflow", "pool_timeout"):
+            options.pop(key, None)
+
+    return options
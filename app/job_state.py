@@ -0,0 +1,53 @@
+import json
+import os
+import re
+
+# ===========================================
+# 백그라운드 작업 진행 상황 (작업 1개 = JSON 파일 1개)
+#  - 작업을 시작한 워커와 진행 상황을 묻는 워커가 달라도 같은 값을 보도록 디스크에 저장
+#  - 쓰기는 임시 파일 → os.replace (읽는 쪽이 쓰다 만 파일을 보지 않음)
+#  - 작업 id 는 uuid4 hex 만 허용 (경로 조작 방지)
+# ===========================================
+
+JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _path(folder, job_id, prefix):
+    return os.path.join(folder, f"{prefix}{job_id}.json")
+
+
+def save_job(folder, job, prefix=""):
+    os.makedirs(folder, exist_ok=True)
+    path = _path(folder, job["id"], prefix)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_job(folder, job_id, prefix=""):
+    """없거나 잘못된 id 면 None"""
+    if not JOB_ID_RE.match(job_id or ""):
+        return None
+    try:
+        with open(_path(folder, job_id, prefix), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def prune_jobs(folder, keep, prefix=""):
+    """최근 keep 개 작업 상태만 남김"""
+    names = [n for n in os.listdir(folder) if n.startswith(prefix) and n.endswith(".json")]
+
+    def mtime(name):
+        try:
+            return os.path.getmtime(os.path.join(folder, name))
+        except FileNotFoundError:
+            return 0
+
+    for name in sorted(names, key=mtime)[:-keep] if keep else []:
+        try:
+            os.remove(os.path.join(folder, name))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,241 @@
+import functools
+import random
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from app import db
+
+# ===========================================
+# 요청 계측 (프로세스 메모리에 집계)
+#  - 라우트별 응답 시간 (p50 / p95 / p99 + Prometheus 히스토그램)
+#  - 요청당 SQL 쿼리 수 / 시간 (SQLAlchemy cursor 이벤트)
+#  - 외부 호출 시간 (알리고, 네이트온) → @timed_external
+#  - METRICS_ENABLED 가 꺼져 있으면 훅을 아예 등록하지 않음
+#  - 워커 프로세스마다 따로 집계 (gunicorn 워커 여러 개면 워커별 값)
+# ===========================================
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)   # 초
+RESERVOIR_SIZE = 1024
+
+_enabled = False
+
+
+class Histogram:
+    """고정 버킷 카운트 + 백분위 계산용 샘플 저장소 (reservoir sampling)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.buckets = [0] * len(BUCKETS)
+        self.samples = []
+
+    def observe(self, value, error=False):
+        self.count += 1
+        self.total += value
+        if error:
+            self.errors += 1
+
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(value)
+        else:
+            j = random.randrange(self.count)
+            if j < RESERVOIR_SIZE:
+                self.samples[j] = value
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}       # route → 응답 시간
+            self.sql_count = {}      # route → 요청당 쿼리 수
+            self.sql_time = {}       # route → 요청당 SQL 시간
+            self.external = {}       # 외부 호출 이름 → 시간
+            self.started_at = time.time()
+
+    @staticmethod
+    def _hist(table, key):
+        hist = table.get(key)
+        if hist is None:
+            hist = table[key] = Histogram()
+        return hist
+
+    def record_request(self, route, seconds, status, sql_count, sql_time):
+        with self._lock:
+            self._hist(self.requests, route).observe(seconds, error=status >= 500)
+            self._hist(self.sql_count, route).observe(sql_count)
+            self._hist(self.sql_time, route).observe(sql_time)
+
+    def record_external(self, name, seconds, error):
+        with self._lock:
+            self._hist(self.external, name).observe(seconds, error=error)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "uptime": time.time() - self.started_at,
+                "routes": [
+                    dict(
+                        route=route,
+                        **hist.summary(),
+                        sql_count_avg=self.sql_count[route].summary()["avg"],
+                        sql_count_p95=self.sql_count[route].percentile(95),
+                        sql_time_avg=self.sql_time[route].summary()["avg"],
+                        sql_time_p95=self.sql_time[route].percentile(95),
+                    )
+                    for route, hist in sorted(self.requests.items())
+                ],
+                "external": [
+                    dict(name=name, **hist.summary())
+                    for name, hist in sorted(self.external.items())
+                ],
+            }
+
+    def prometheus(self):
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            _prom_histogram(lines, "preop_request_duration_seconds", "route", self.requests,
+                            "요청 처리 시간")
+            _prom_histogram(lines, "preop_request_sql_seconds", "route", self.sql_time,
+                            "요청당 SQL 실행 시간")
+            _prom_summary(lines, "preop_request_sql_queries", "route", self.sql_count,
+                          "요청당 SQL 쿼리 수")
+            _prom_histogram(lines, "preop_external_call_seconds", "name", self.external,
+                            "외부 호출 시간")
+
+            lines.append("# HELP preop_external_call_errors_total 외부 호출 실패 수")
+            lines.append("# TYPE preop_external_call_errors_total counter")
+            for name, hist in sorted(self.external.items()):
+                lines.append(f'preop_external_call_errors_total{{name="{_label(name)}"}} {hist.errors}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _prom_histogram(lines, metric, label, table, help_text):
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} histogram")
+    for key, hist in sorted(table.items()):
+        lab = f'{label}="{_label(key)}"'
+        cumulative = 0
+        for bound, n in zip(BUCKETS, hist.buckets):
+            cumulative += n
+            lines.append(f'{metric}_bucket{{{lab},le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{lab},le="+Inf"}} {hist.count}')
+        lines.append(f"{metric}_sum{{{lab}}} {hist.total:.6f}")
+        lines.append(f"{metric}_count{{{lab}}} {hist.count}")
+
+
+def _prom_summary(lines, metric, label, table, help_text):
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} summary")
+    for key, hist in sorted(table.items()):
+        lab = f'{label}="{_label(key)}"'
+        for q in (50, 95, 99):
+            lines.append(f'{metric}{{{lab},quantile="{q / 100}"}} {hist.percentile(q)}')
+        lines.append(f"{metric}_sum{{{lab}}} {hist.total:.0f}")
+        lines.append(f"{metric}_count{{{lab}}} {hist.count}")
+
+
+registry = Registry()
+
+
+def metrics_enabled():
+    return _enabled
+
+
+# ===========================================
+# Flask / SQLAlchemy 훅
+# ===========================================
+def init_metrics(app):
+    """METRICS_ENABLED 일 때만 요청/SQL 훅 등록 (db.init_app 이후 호출)"""
+    global _enabled
+    if not app.config.get("METRICS_ENABLED"):
+        return
+    _enabled = True
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["metrics_start"].pop()
+        if has_request_context() and "metrics_start" in g:
+            g.metrics_sql_count += 1
+            g.metrics_sql_time += time.perf_counter() - start
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql_count = 0
+        g.metrics_sql_time = 0.0
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            registry.record_request(
+                request.url_rule.rule if request.url_rule else "(unmatched)",
+                time.perf_counter() - start,
+                response.status_code,
+                g.metrics_sql_count,
+                g.metrics_sql_time,
+            )
+        return response
+
+
+def timed_external(name, ok=None):
+    """외부 호출 시간 기록 데코레이터. ok(결과) 가 False 거나 예외면 실패로 집계"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+
+            start = time.perf_counter()
+            error = True
+            try:
+                result = fn(*args, **kwargs)
+                error = ok is not None and not ok(result)
+                return result
+            finally:
+                registry.record_external(name, time.perf_counter() - start, error)
+        return wrapper
+    return decorate
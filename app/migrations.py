@@ -0,0 +1,206 @@
+from datetime import datetime
+
+from sqlalchemy import false, inspect, text
+
+from app import db
+from app.models import PreOpPatient
+
+# ===========================================
+# 버전 관리되는 DB 마이그레이션
+#  - schema_migrations 테이블에 적용된 버전 기록
+#  - 마이그레이션은 버전 순서대로, 각각 별도 트랜잭션
+#  - 각 마이그레이션은 여러 번 실행해도 안전해야 함
+#    (IF NOT EXISTS / 컬럼 존재 확인) → 워커 여러 개가 동시에 돌려도 문제 없음
+# ===========================================
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+# -------------------------------------------
+# 헬퍼
+# -------------------------------------------
+def has_column(conn, table, column):
+    return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def add_column(conn, column, default=None):
+    """모델 컬럼이 DB 에 없을 때만 ALTER TABLE ... ADD COLUMN
+
+    타입은 접속한 DB(SQLite / PostgreSQL) 문법으로 변환,
+    default 는 SQL 표현식 (예: false()) 을 DB 문법으로 변환해서 붙인다.
+    """
+    table = column.table.name
+    if has_column(conn, table, column.name):
+        return False
+
+    ddl = column.type.compile(dialect=conn.dialect)
+    if default is not None:
+        ddl += f" DEFAULT {default.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True})}"
+
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} {ddl}"))
+    return True
+
+
+def create_index(conn, name, table, columns):
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+# -------------------------------------------
+# 마이그레이션 목록
+# -------------------------------------------
+@migration(1, "preop_patients: sms_sent / sms_sent_at 컬럼 추가")
+def _add_sms_columns(conn):
+    cols = PreOpPatient.__table__.c
+    add_column(conn, cols.sms_sent, default=false())
+    add_column(conn, cols.sms_sent_at)
+
+
+@migration(2, "조회 경로 복합 인덱스 추가")
+def _add_access_path_indexes(conn):
+    create_index(conn, "ix_preop_patients_surgery_date_name", "preop_patients", ["surgery_date", "name"])
+    create_index(conn, "ix_preop_patients_patient_id_surgery_date", "preop_patients", ["patient_id", "surgery_date"])
+    create_index(conn, "ix_preop_assessments_patient_id_step", "preop_assessments", ["patient_id", "step"])
+
+
+FTS_COLUMNS = ["name", "patient_id", "phone", "doctor_name", "surgery_name"]
+
+
+def sqlite_supports_trigram(conn):
+    """FTS5 trigram 토크나이저 사용 가능 여부 (SQLite 3.34+ & FTS5 포함 빌드)"""
+    try:
+        conn.execute(text("CREATE VIRTUAL TABLE temp._fts_probe USING fts5(x, tokenize='trigram')"))
+        conn.execute(text("DROP TABLE temp._fts_probe"))
+        return True
+    except Exception:
+        return False
+
+
+@migration(3, "환자 검색용 FTS5 trigram 인덱스 (SQLite)")
+def _add_patient_search_index(conn):
+    # PostgreSQL 등은 LIKE 검색 유지
+    if conn.dialect.name != "sqlite" or not sqlite_supports_trigram(conn):
+        return
+
+    cols = ", ".join(FTS_COLUMNS)
+    new_vals = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+    old_vals = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+    # 외부 콘텐츠 테이블: 원본은 preop_patients, FTS 에는 인덱스만 저장
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS preop_patients_fts USING fts5("
+        f"{cols}, content='preop_patients', content_rowid='id', tokenize='trigram')"
+    ))
+
+    # insert / update / delete 시 자동 동기화
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS preop_patients_fts_ai AFTER INSERT ON preop_patients BEGIN "
+        f"INSERT INTO preop_patients_fts(rowid, {cols}) VALUES (new.id, {new_vals}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS preop_patients_fts_ad AFTER DELETE ON preop_patients BEGIN "
+        f"INSERT INTO preop_patients_fts(preop_patients_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS preop_patients_fts_au AFTER UPDATE ON preop_patients BEGIN "
+        f"INSERT INTO preop_patients_fts(preop_patients_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO preop_patients_fts(rowid, {cols}) VALUES (new.id, {new_vals}); END"
+    ))
+
+    # 기존 환자들 인덱싱
+    conn.execute(text("INSERT INTO preop_patients_fts(preop_patients_fts) VALUES ('rebuild')"))
+
+
+@migration(4, "preop_patients: updated_at 컬럼 추가 (관리자 보기 캐시 키)")
+def _add_updated_at(conn):
+    add_column(conn, PreOpPatient.__table__.c.updated_at)
+
+    # 답변 저장마다 updated_at 이 바뀌므로, FTS 동기화는 검색 컬럼이 바뀔 때만
+    if conn.dialect.name != "sqlite":
+        return
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'preop_patients_fts_au'"
+    )).first()
+    if not exists:
+        return
+
+    cols = ", ".join(FTS_COLUMNS)
+    new_vals = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+    old_vals = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+    conn.execute(text("DROP TRIGGER preop_patients_fts_au"))
+    conn.execute(text(
+        f"CREATE TRIGGER preop_patients_fts_au AFTER UPDATE OF {cols} ON preop_patients BEGIN "
+        f"INSERT INTO preop_patients_fts(preop_patients_fts, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO preop_patients_fts(rowid, {cols}) VALUES (new.id, {new_vals}); END"
+    ))
+
+
+@migration(5, "preop_patients: source / cancelled_at 컬럼 추가 (재업로드 취소는 표시만)")
+def _add_cancel_columns(conn):
+    cols = PreOpPatient.__table__.c
+    # 기존 환자는 등록 경로를 알 수 없으므로 source 는 비워 둠 (재업로드 취소 대상 아님)
+    add_column(conn, cols.source)
+    add_column(conn, cols.cancelled_at)
+
+
+# -------------------------------------------
+# 실행기
+# -------------------------------------------
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INTEGER PRIMARY KEY,"
+        " description VARCHAR(200),"
+        " applied_at VARCHAR(30)"
+        ")"
+    ))
+
+
+def applied_versions(conn):
+    _ensure_version_table(conn)
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def current_version(engine=None):
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        versions = applied_versions(conn)
+    return max(versions, default=0)
+
+
+def run_migrations(engine=None, log=print):
+    """아직 적용 안 된 마이그레이션 실행, 적용한 버전 리스트 반환"""
+    engine = engine or db.engine
+    applied = []
+
+    for version, description, fn in MIGRATIONS:
+        with engine.begin() as conn:
+            if version in applied_versions(conn):
+                continue
+
+            fn(conn)
+
+            # 다른 워커가 먼저 기록했으면 건너뜀
+            exists = conn.execute(
+                text("SELECT 1 FROM schema_migrations WHERE version = :v"), {"v": version}
+            ).first()
+            if not exists:
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                    {"v": version, "d": description, "t": datetime.utcnow().isoformat(timespec="seconds")},
+                )
+
+        applied.append(version)
+        log(f"✅ migration {version}: {description}")
+
+    return applied
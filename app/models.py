@@ -2,6 +2,7 @@ from app import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import json
 
 
 class User(UserMixin, db.Model):
@@ -24,6 +25,12 @@ class User(UserMixin, db.Model):
 
 class PreOpPatient(db.Model):
     __tablename__ = "preop_patients"
+    __table_args__ = (
+        # 리스트: 수술일 필터 + (수술일, 이름) 정렬
+        db.Index("ix_preop_patients_surgery_date_name", "surgery_date", "name"),
+        # 엑셀 등록 중복 확인: (등록번호, 수술일)
+        db.Index("ix_preop_patients_patient_id_surgery_date", "patient_id", "surgery_date"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -39,9 +46,17 @@ class PreOpPatient(db.Model):
 
     submitted = db.Column(db.Boolean, default=False)
 
+    # 등록 경로: "gen" = Gen 엑셀 일괄 등록 / None = 개별 등록 또는 이전 데이터
+    # → 스케줄 재업로드에서 빠졌을 때 취소 대상은 "gen" 환자만
+    source = db.Column(db.String(10), nullable=True)
+    # 스케줄에서 빠져 취소된 시각 (삭제하지 않고 표시만, 리스트 / 내보내기 / 문자 대상에서 제외)
+    cancelled_at = db.Column(db.DateTime, nullable=True)
+
     token = db.Column(db.String(100), unique=True, nullable=False)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # 환자 정보 / 답변이 마지막으로 바뀐 시각 (관리자 보기 화면 캐시 키)
+    updated_at = db.Column(db.DateTime, nullable=True, onupdate=datetime.utcnow)
 
     age = db.Column(db.String(5))
 
@@ -52,9 +67,20 @@ class PreOpPatient(db.Model):
         backref=db.backref("patient", passive_deletes=True)
     )
 
+    # step 별 JSON 답변 (ANSWER_STORAGE=json 일 때 사용)
+    step_answers = db.relationship(
+        "PreOpStepAnswers",
+        cascade="all, delete-orphan",
+        backref=db.backref("patient", passive_deletes=True)
+    )
+
 
 class PreOpAssessment(db.Model):
     __tablename__ = "preop_assessments"
+    __table_args__ = (
+        # 문진 단계별 조회: (환자, step)
+        db.Index("ix_preop_assessments_patient_id_step", "patient_id", "step"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -69,3 +95,61 @@ class PreOpAssessment(db.Model):
     answer = db.Column(db.Text, nullable=False)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class PreOpStepAnswers(db.Model):
+    """(환자, step) 당 JSON 문서 1개로 저장한 문진 답변 {question: answer}"""
+    __tablename__ = "preop_step_answers"
+    __table_args__ = (
+        db.UniqueConstraint("patient_id", "step", name="uq_preop_step_answers_patient_id_step"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    patient_id = db.Column(
+        db.Integer,
+        db.ForeignKey("preop_patients.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    step = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.Text, nullable=False, default="{}")
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def answers(self):
+        return json.loads(self.data or "{}")
+
+    @answers.setter
+    def answers(self, value):
+        self.data = dump_answers(value)
+
+
+def dump_answers(answers):
+    return json.dumps(answers, ensure_ascii=False, separators=(",", ":"))
+
+
+class NotificationOutbox(db.Model):
+    """보낼 알림 (네이트온 웹훅) — 요청 처리와 분리해서 백그라운드에서 전송"""
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        db.Index("ix_notification_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    channel = db.Column(db.String(20), nullable=False, default="nateon")
+    content = db.Column(db.Text, nullable=False)
+    summary = db.Column(db.String(300), nullable=True)   # 여러 건 묶어 보낼 때 쓰는 한 줄 요약
+
+    # pending → sending → sent / failed (재시도 횟수 초과)
+    status = db.Column(db.String(10), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim = db.Column(db.String(32), nullable=True)      # 전송 중인 워커 표시
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(300), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
@@ -0,0 +1,129 @@
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from app import db
+from app.models import NotificationOutbox
+
+# ===========================================
+# 알림 outbox (네이트온 웹훅)
+#  - 요청에서는 outbox 에 한 줄 추가만 (같은 트랜잭션) → 웹훅이 느리거나 죽어도 바로 응답
+#  - 워커마다 백그라운드 스레드가 NOTIFY_DISPATCH_INTERVAL 초마다 전송
+#  - 실패하면 지수 백오프로 재시도, NOTIFY_MAX_ATTEMPTS 회 실패하면 failed
+#  - 한 번에 NOTIFY_DIGEST_THRESHOLD 건 이상 쌓여 있으면 요약 메시지 1개로 묶어 전송
+#  - 워커 여러 개가 같은 행을 보내지 않도록 UPDATE ... WHERE status='pending' 으로 선점
+# ===========================================
+
+CLAIM_TIMEOUT = timedelta(minutes=10)   # 전송 중 워커가 죽었을 때 다시 pending 으로
+
+
+def enqueue_nateon(content, summary=None):
+    """네이트온 메시지를 outbox 에 추가 (commit 은 호출한 쪽에서). 웹훅 미설정이면 무시"""
+    if not current_app.config.get("NATEON_WEBHOOK_URL"):
+        return None
+
+    item = NotificationOutbox(channel="nateon", content=content, summary=summary)
+    db.session.add(item)
+    return item
+
+
+def backoff_delay(attempts):
+    """attempts 번째 실패 후 다음 시도까지 대기 시간"""
+    base = current_app.config["NOTIFY_RETRY_BASE"]
+    cap = current_app.config["NOTIFY_RETRY_MAX"]
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def build_digest(items):
+    lines = [f"[수술 전 문진 제출 완료 {len(items)}건]"]
+    lines += [f"- {item.summary or item.content.splitlines()[0]}" for item in items]
+    lines.append("링크: https://nursing-assessment.onrender.com")
+    return "\n".join(lines)
+
+
+def claim_due(batch_size):
+    """보낼 차례가 된 pending 행을 이 워커 몫으로 표시하고 돌려줌"""
+    now = datetime.utcnow()
+
+    # 전송 도중 멈춘 행 복구 (매 차례 모든 워커가 쓰기 잠금을 잡지 않도록 있을 때만 UPDATE)
+    stale = (NotificationOutbox.status == "sending", NotificationOutbox.claimed_at < now - CLAIM_TIMEOUT)
+    if db.session.execute(select(NotificationOutbox.id).where(*stale).limit(1)).first():
+        db.session.execute(update(NotificationOutbox).where(*stale).values(status="pending", claim=None))
+
+    ids = db.session.execute(
+        select(NotificationOutbox.id)
+        .where(NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= now)
+        .order_by(NotificationOutbox.id)
+        .limit(batch_size)
+    ).scalars().all()
+
+    if not ids:
+        db.session.commit()
+        return []
+
+    claim = uuid.uuid4().hex
+    db.session.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(ids), NotificationOutbox.status == "pending")
+        .values(status="sending", claim=claim, claimed_at=now)
+    )
+    db.session.commit()
+
+    return NotificationOutbox.query.filter_by(claim=claim).order_by(NotificationOutbox.id).all()
+
+
+def dispatch_outbox():
+    """백그라운드 주기 작업: outbox 전송 (보낸 메시지 수 반환)"""
+    from app.preop.utils import send_nateon_message
+
+    if not current_app.config.get("NATEON_WEBHOOK_URL"):
+        return 0
+
+    items = claim_due(current_app.config["NOTIFY_BATCH_SIZE"])
+    if not items:
+        return 0
+
+    # 몰려 들어온 경우 요약 1건, 아니면 하나씩
+    if len(items) >= current_app.config["NOTIFY_DIGEST_THRESHOLD"]:
+        batches = [(items, build_digest(items))]
+    else:
+        batches = [([item], item.content) for item in items]
+
+    sent = 0
+    retry_at = None
+    now = datetime.utcnow()
+    for group, content in batches:
+        # 한 번 실패하면 이번 차례의 나머지는 보내지 않고 같이 재시도 대기 (보내지 않았으니 시도 횟수는 그대로)
+        if retry_at is not None:
+            for item in group:
+                item.status = "pending"
+                item.next_attempt_at = retry_at
+                item.claim = None
+            db.session.commit()
+            continue
+
+        ok = send_nateon_message(content)
+        for item in group:
+            if ok:
+                item.status = "sent"
+                item.sent_at = now
+            else:
+                item.attempts += 1
+                item.last_error = "webhook 전송 실패"
+                if item.attempts >= current_app.config["NOTIFY_MAX_ATTEMPTS"]:
+                    item.status = "failed"
+                else:
+                    item.status = "pending"
+                    item.next_attempt_at = now + backoff_delay(item.attempts)
+            item.claim = None
+
+        if ok:
+            sent += 1
+        else:
+            retry_at = now + backoff_delay(max(item.attempts for item in group))
+        db.session.commit()
+
+    return sent
+
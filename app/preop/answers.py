@@ -0,0 +1,296 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import Text, cast, delete, func, insert, literal, select, tuple_, update
+from flask import current_app
+
+from app import db
+from app.models import PreOpAssessment, PreOpPatient, PreOpStepAnswers, dump_answers
+from app.view_cache import invalidate_view
+
+# ===========================================
+# 문진 답변 저장/조회
+#  - ANSWER_STORAGE=eav  (기본) : 질문 1개 = preop_assessments 1행
+#  - ANSWER_STORAGE=json        : (환자, step) 1개 = preop_step_answers 1행 (JSON)
+#  - 어느 쪽이든 form_step / preop_view 에는 같은 dict 모양으로 돌려줌
+#  - 저장 시 기존 답변과 비교해서 바뀐 것만 씀
+#    (뒤로/다음만 눌러도 전체 삭제 후 재삽입하던 방식 대체)
+#  - json 방식은 문서를 INSERT ... ON CONFLICT DO UPDATE 한 문장으로 씀
+#    → 자동 저장 두 개가 겹쳐도 unique 충돌이나 서로 덮어쓰기 없음
+# ===========================================
+
+
+def use_json_storage():
+    return current_app.config.get("ANSWER_STORAGE") == "json"
+
+
+# -------------------------------------------
+# 조회
+# -------------------------------------------
+def load_step(patient_id, step):
+    """→ (답변 dict, 저장 시 save_step_answers 에 넘길 기존 데이터)"""
+    if use_json_storage():
+        doc = PreOpStepAnswers.query.filter_by(patient_id=patient_id, step=step).first()
+        return (doc.answers if doc else {}), doc
+
+    rows = PreOpAssessment.query.filter_by(patient_id=patient_id, step=step).all()
+    return {r.question: r.answer for r in rows}, rows
+
+
+def load_all_answers(patient_id):
+    """전체 step 답변 → {step: {question: answer}} (쿼리 1번)"""
+    saved_data = {}
+
+    if use_json_storage():
+        for doc in PreOpStepAnswers.query.filter_by(patient_id=patient_id).order_by(PreOpStepAnswers.step):
+            saved_data[doc.step] = doc.answers
+        return saved_data
+
+    rows = PreOpAssessment.query.filter_by(
+        patient_id=patient_id
+    ).order_by(PreOpAssessment.step).all()
+
+    for r in rows:
+        if r.step not in saved_data:
+            saved_data[r.step] = {}
+        saved_data[r.step][r.question] = r.answer
+
+    return saved_data
+
+
+def load_answers_for(patient_ids):
+    """환자 여러 명 답변 → {patient id: {step: {question: answer}}} (쿼리 1번, 내보내기용)"""
+    result = {pid: {} for pid in patient_ids}
+    if not patient_ids:
+        return result
+
+    if use_json_storage():
+        query = select(PreOpStepAnswers.patient_id, PreOpStepAnswers.step, PreOpStepAnswers.data).where(
+            PreOpStepAnswers.patient_id.in_(patient_ids)
+        )
+        for pid, step, data in db.session.execute(query):
+            result[pid][step] = json.loads(data or "{}")
+        return result
+
+    query = select(PreOpAssessment.patient_id, PreOpAssessment.step, PreOpAssessment.question, PreOpAssessment.answer).where(
+        PreOpAssessment.patient_id.in_(patient_ids)
+    ).order_by(PreOpAssessment.id)
+    for pid, step, question, answer in db.session.execute(query):
+        result[pid].setdefault(step, {})[question] = answer
+    return result
+
+
+def answer_keys(patient_ids):
+    """patient_ids(서브쿼리) 환자들에게 있는 (step, question) 전체 → 내보내기 열 순서
+
+    step 순, 같은 step 안에서는 처음 저장된 순서 (= 문진 화면 순서)
+    """
+    if use_json_storage():
+        keys = {}
+        query = select(PreOpStepAnswers.step, PreOpStepAnswers.data).where(
+            PreOpStepAnswers.patient_id.in_(patient_ids)
+        ).order_by(PreOpStepAnswers.step)
+        for step, data in db.session.execute(query.execution_options(yield_per=500)):
+            for question in json.loads(data or "{}"):
+                keys.setdefault((step, question), None)
+        return list(keys)
+
+    query = select(PreOpAssessment.step, PreOpAssessment.question).where(
+        PreOpAssessment.patient_id.in_(patient_ids)
+    ).group_by(PreOpAssessment.step, PreOpAssessment.question).order_by(
+        PreOpAssessment.step, func.min(PreOpAssessment.id)
+    )
+    return [tuple(row) for row in db.session.execute(query)]
+
+
+# -------------------------------------------
+# 저장
+# -------------------------------------------
+def save_step_answers(patient_id, step, answers, saved):
+    """answers(dict) 를 해당 step 의 최종 답변으로 저장 (commit 은 호출한 쪽에서)
+
+    saved : load_step 이 돌려준 기존 데이터
+    answers 에 없는 질문은 삭제, 값이 같은 질문은 건드리지 않음.
+    변경 건수 dict 반환.
+    """
+    if use_json_storage():
+        changes = _save_json(patient_id, step, answers, saved)
+    else:
+        changes = _save_eav(patient_id, step, answers, saved)
+
+    if any(changes.values()):
+        touch_patient(patient_id)
+    return changes
+
+
+def touch_patient(patient_id):
+    """답변이 바뀌면 환자 updated_at 갱신 + 관리자 보기 캐시 삭제"""
+    db.session.execute(
+        update(PreOpPatient).where(PreOpPatient.id == patient_id).values(updated_at=datetime.utcnow()),
+        execution_options={"synchronize_session": False},
+    )
+    invalidate_view(patient_id)
+
+
+def _upsert_json(patient_id, step, answers, fields=None):
+    """(환자, step) 문서를 한 문장으로 저장
+
+    fields 가 없으면 answers 로 교체,
+    있으면 DB 에 있는 문서에 fields 만 합침 (값이 None 이면 삭제, 다른 요청이 먼저 쓴 질문은 유지)
+    """
+    table = PreOpStepAnswers.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import JSONB, insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+
+    if fields is None:
+        data = upsert(table).excluded.data
+    elif dialect == "postgresql":
+        # jsonb || 로 덮어쓰고 None(null) 이 된 질문은 제거 (답변 값은 항상 문자열)
+        merged = cast(table.c.data, JSONB).op("||")(cast(literal(json.dumps(fields)), JSONB))
+        data = cast(func.jsonb_strip_nulls(merged), Text)
+    else:
+        # RFC 7396 merge patch: null 은 삭제
+        data = func.json_patch(table.c.data, json.dumps(fields, ensure_ascii=False))
+
+    now = datetime.utcnow()
+    stmt = upsert(table).values(
+        patient_id=patient_id, step=step, data=dump_answers(answers), updated_at=now,
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.patient_id, table.c.step],
+        set_={"data": data, "updated_at": now},
+    ))
+
+
+def _save_json(patient_id, step, answers, doc, fields=None):
+    if doc is None:
+        _upsert_json(patient_id, step, answers, fields)
+        return {"inserted": len(answers), "updated": 0, "deleted": 0}
+
+    old = doc.answers
+    if old == answers:
+        return {"inserted": 0, "updated": 0, "deleted": 0}
+
+    if fields is None:
+        doc.answers = answers
+    else:
+        _upsert_json(patient_id, step, answers, fields)
+    return {
+        "inserted": sum(1 for q in answers if q not in old),
+        "updated": sum(1 for q in answers if q in old and old[q] != answers[q]),
+        "deleted": sum(1 for q in old if q not in answers),
+    }
+
+
+def _save_eav(patient_id, step, answers, rows):
+    existing = {}
+    delete_ids = []
+
+    for r in rows:
+        if r.question in existing:
+            delete_ids.append(r.id)      # 같은 질문이 중복 저장돼 있던 경우 정리
+        else:
+            existing[r.question] = r
+
+    inserts = []
+    updates = []
+
+    for question, answer in answers.items():
+        r = existing.pop(question, None)
+        if r is None:
+            inserts.append({"patient_id": patient_id, "step": step, "question": question, "answer": answer})
+        elif r.answer != answer:
+            updates.append({"id": r.id, "answer": answer})
+
+    # 이번 제출에 없는 질문 → 삭제
+    delete_ids.extend(r.id for r in existing.values())
+
+    if delete_ids:
+        db.session.execute(
+            delete(PreOpAssessment).where(PreOpAssessment.id.in_(delete_ids)),
+            execution_options={"synchronize_session": False},
+        )
+    if updates:
+        db.session.execute(update(PreOpAssessment), updates)
+    if inserts:
+        db.session.execute(insert(PreOpAssessment), inserts)
+
+    return {"inserted": len(inserts), "updated": len(updates), "deleted": len(delete_ids)}
+
+
+def patch_step_answers(patient_id, step, fields):
+    """자동 저장: fields 에 있는 질문만 바꿈 (값이 None 이면 삭제, commit 은 호출한 쪽에서)"""
+    saved_answers, saved = load_step(patient_id, step)
+
+    answers = dict(saved_answers)
+    for question, answer in fields.items():
+        if answer is None:
+            answers.pop(question, None)
+        else:
+            answers[question] = answer
+
+    # json 방식은 읽어 둔 문서가 아니라 DB 에 있는 문서에 fields 만 합침 (동시 자동 저장)
+    if use_json_storage():
+        changes = _save_json(patient_id, step, answers, saved, fields)
+        if any(changes.values()):
+            touch_patient(patient_id)
+        return changes
+
+    return save_step_answers(patient_id, step, answers, saved)
+
+
+# ===========================================
+# 저장 방식 전환 (scripts/migrate_answers.py 에서 사용)
+#  - 원본에 있는 (환자, step) 만 대상 쪽에서 지우고 다시 만든다
+# ===========================================
+def _delete_pairs(model, pairs, batch_size):
+    pairs = list(pairs)
+    for i in range(0, len(pairs), batch_size):
+        db.session.execute(
+            delete(model).where(tuple_(model.patient_id, model.step).in_(pairs[i:i + batch_size])),
+            execution_options={"synchronize_session": False},
+        )
+
+
+def copy_eav_to_json(batch_size=500):
+    """preop_assessments → preop_step_answers. 만든 문서 수 반환"""
+    docs = {}
+    rows = db.session.execute(
+        db.select(PreOpAssessment.patient_id, PreOpAssessment.step, PreOpAssessment.question, PreOpAssessment.answer)
+        .order_by(PreOpAssessment.patient_id, PreOpAssessment.step, PreOpAssessment.id)
+    )
+    for patient_id, step, question, answer in rows:
+        docs.setdefault((patient_id, step), {})[question] = answer
+
+    _delete_pairs(PreOpStepAnswers, docs.keys(), batch_size)
+
+    payload = [
+        {"patient_id": pid, "step": step, "data": dump_answers(answers)}
+        for (pid, step), answers in docs.items()
+    ]
+    if payload:
+        db.session.execute(insert(PreOpStepAnswers), payload)
+
+    db.session.commit()
+    return len(payload)
+
+
+def copy_json_to_eav(batch_size=500):
+    """preop_step_answers → preop_assessments. 만든 행 수 반환"""
+    docs = PreOpStepAnswers.query.order_by(PreOpStepAnswers.patient_id, PreOpStepAnswers.step).all()
+
+    _delete_pairs(PreOpAssessment, {(d.patient_id, d.step) for d in docs}, batch_size)
+
+    payload = [
+        {"patient_id": d.patient_id, "step": d.step, "question": q, "answer": a}
+        for d in docs
+        for q, a in d.answers.items()
+    ]
+    if payload:
+        db.session.execute(insert(PreOpAssessment), payload)
+
+    db.session.commit()
+    return len(payload)
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import PreOpPatient
+
+
+# ===========================================
+# 환자용 문진 화면: token → 환자 정보 캐시 (워커 프로세스마다)
+#  - start / form_step / preop_complete 는 GET 때마다 token 조회를 하지 않음
+#  - 캐시 값은 ORM 객체가 아니라 컬럼 값 사본 (세션과 무관하게 재사용)
+#  - 값을 바꾸는 곳(관리자 수정/삭제, 재업로드, step9 제출)에서 무효화
+#  - 다른 워커에서 바뀐 값은 PATIENT_CACHE_TTL 이 지나면 반영
+#    → 답변을 쓰는 요청은 사본을 믿지 않고 lock_patient_row 로 실제 행을 먼저 확인
+# ===========================================
+class PatientCache:
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token, ttl):
+        with self._lock:
+            hit = self._entries.get(token)
+            if hit is None:
+                return None
+            snapshot, expires = hit
+            if expires <= time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return snapshot
+
+    def put(self, token, snapshot, ttl, max_entries):
+        with self._lock:
+            self._entries[token] = (snapshot, time.monotonic() + ttl)
+            self._entries.move_to_end(token)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+patient_cache = PatientCache()
+
+
+def snapshot_patient(patient):
+    """ORM 객체 → 컬럼 값만 담은 읽기 전용 사본"""
+    return SimpleNamespace(**{
+        c.key: getattr(patient, c.key) for c in PreOpPatient.__table__.columns
+    })
+
+
+def get_patient(token):
+    """token 으로 환자 사본 조회 (없으면 None, 없는 token 은 캐시하지 않음)"""
+    ttl = current_app.config["PATIENT_CACHE_TTL"]
+
+    if ttl > 0:
+        snapshot = patient_cache.get(token, ttl)
+        if snapshot is not None:
+            return snapshot
+
+    patient = PreOpPatient.query.filter_by(token=token).first()
+    if patient is None:
+        return None
+
+    snapshot = snapshot_patient(patient)
+    if ttl > 0:
+        patient_cache.put(token, snapshot, ttl, current_app.config["PATIENT_CACHE_MAX_ENTRIES"])
+    return snapshot
+
+
+def lock_patient_row(snapshot):
+    """쓰기 전에 사본 → 현재 세션의 ORM 객체 (삭제됐으면 캐시에서 빼고 None)
+
+    같은 트랜잭션에서 SELECT ... FOR UPDATE (PostgreSQL) 로 commit 까지 삭제를 막고,
+    token 도 비교해서 SQLite 가 id 를 재사용한 다른 환자에 답변이 붙지 않도록 한다.
+    """
+    row = db.session.execute(
+        select(PreOpPatient)
+        .where(PreOpPatient.id == snapshot.id, PreOpPatient.token == snapshot.token)
+        .with_for_update()
+    ).scalar_one_or_none()
+    if row is None:
+        patient_cache.discard(snapshot.token)
+    return row
+
+
+def invalidate_patient(token=None):
+    """token 하나 (None 이면 전체) 캐시 삭제"""
+    if token is None:
+        patient_cache.clear()
+    else:
+        patient_cache.discard(token)
@@ -1,6 +1,8 @@
-from flask import render_template, request, redirect, url_for, flash, current_app
+from flask import render_template, request, redirect, url_for, flash, current_app, abort, jsonify
 from app.preop import preop_bp
-from app.models import PreOpPatient, PreOpAssessment
+from app.preop.answers import load_all_answers, load_step, patch_step_answers, save_step_answers
+from app.preop.patient_cache import get_patient, invalidate_patient, lock_patient_row
+from app.profiling import note_patients
 from app import db
 from datetime import datetime
 import os
@@ -12,7 +14,7 @@ from zoneinfo import ZoneInfo
 # =====================================
 @preop_bp.route("/start/<token>")
 def start(token):
-    patient = PreOpPatient.query.filter_by(token=token).first()
+    patient = get_patient(token)
 
     if not patient:
         return "잘못된 접근입니다.", 404
@@ -22,15 +24,22 @@ def start(token):
 
 @preop_bp.route("/form/<token>/step/<int:step>", methods=["GET", "POST"])
 def form_step(token, step):
-    patient = PreOpPatient.query.filter_by(token=token).first_or_404()
+    patient = get_patient(token)
+    if patient is None:
+        abort(404)
+
+    # 저장할 때는 캐시된 사본이 아니라 실제 행이 있는지 확인 (다른 워커에서 삭제된 환자면 404)
+    row = None
+    if request.method == "POST":
+        row = lock_patient_row(patient)
+        if row is None:
+            abort(404)
 
     # -----------------------------
     # 모든 step에서 기존 데이터 로딩
     # -----------------------------
-    saved_answers = {
-        a.question: a.answer
-        for a in PreOpAssessment.query.filter_by(patient_id=patient.id, step=step).all()
-    }
+    saved_answers, saved_rows = load_step(patient.id, step)
+    note_patients(1)
 
     # =============================
     # STEP 1 : 기본 정보 저장 + 로딩
@@ -58,14 +67,11 @@ def form_step(token, step):
                                     step=step,
                                     saved={})
 
-            # 저장 전 기존 데이터 삭제
-            PreOpAssessment.query.filter_by(patient_id=patient.id, step=1).delete()
-
-            # 저장 (질문/답변 형식으로 저장됨)
-            db.session.add_all([
-                PreOpAssessment(patient_id=patient.id, step=1, question="name", answer=name),
-                PreOpAssessment(patient_id=patient.id, step=1, question="surgery_date", answer=surgery_date),
-            ])
+            # 저장 (질문/답변 형식, 바뀐 것만)
+            save_step_answers(patient.id, 1, {
+                "name": name,
+                "surgery_date": surgery_date,
+            }, saved_rows)
             db.session.commit()
 
             return redirect(url_for("preop.form_step", token=token, step=2))
@@ -81,21 +87,11 @@ def form_step(token, step):
     # =============================
     if step == 2:
         if request.method == "POST":
-            PreOpAssessment.query.filter_by(patient_id=patient.id, step=2).delete()
-
             fields = ["height", "weight", "chief_complaint", "injury_cause"]
 
-            for f in fields:
-                value = request.form.get(f, "")
-                db.session.add(
-                    PreOpAssessment(
-                        patient_id=patient.id,
-                        step=2,
-                        question=f,
-                        answer=value
-                    )
-                )
-
+            save_step_answers(patient.id, 2, {
+                f: request.form.get(f, "") for f in fields
+            }, saved_rows)
             db.session.commit()
             return redirect(url_for("preop.form_step", token=token, step=3))
 
@@ -110,17 +106,11 @@ def form_step(token, step):
     if step == 4:
         if request.method == "POST":
 
-            # 기존 step4 데이터 삭제
-            PreOpAssessment.query.filter_by(patient_id=patient.id, step=4).delete()
-
             # 복용약
-            oral_med = request.form.get("oral_med", "")
-            oral_desc = request.form.get("oral_med_desc", "")
-
-            db.session.add(PreOpAssessment(patient_id=patient.id, step=4,
-                                        question="oral_med", answer=oral_med))
-            db.session.add(PreOpAssessment(patient_id=patient.id, step=4,
-                                        question="oral_med_desc", answer=oral_desc))
+            answers = {
+                "oral_med": request.form.get("oral_med", ""),
+                "oral_med_desc": request.form.get("oral_med_desc", ""),
+            }
 
             # 복용약 이미지
             oral_img = request.files.get("oral_med_image")
@@ -129,25 +119,16 @@ def form_step(token, step):
                 filepath = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
                 oral_img.save(filepath)
 
-                db.session.add(PreOpAssessment(patient_id=patient.id, step=4,
-                                            question="oral_med_image", answer=filename))
+                answers["oral_med_image"] = filename
 
             # 과거 수술 여부
-            sh = request.form.get("surgery_history", "")
-            db.session.add(PreOpAssessment(
-                patient_id=patient.id, step=4,
-                question="surgery_history", answer=sh
-            ))
+            answers["surgery_history"] = request.form.get("surgery_history", "")
 
             # 여러 개의 수술 입력값들 -> 배열로 받기
             sh_desc_list = request.form.getlist("surgery_history_desc[]")
-            combined = "|".join(sh_desc_list)
-
-            db.session.add(PreOpAssessment(
-                patient_id=patient.id, step=4,
-                question="surgery_history_desc", answer=combined
-            ))
+            answers["surgery_history_desc"] = "|".join(sh_desc_list)
 
+            save_step_answers(patient.id, 4, answers, saved_rows)
             db.session.commit()
 
             return redirect(url_for("preop.form_step", token=token, step=5))
@@ -173,40 +154,37 @@ def form_step(token, step):
     # =============================
     if request.method == "POST":
 
-        PreOpAssessment.query.filter_by(patient_id=patient.id, step=step).delete()
+        # 바뀐 답변만 저장
+        # 같은 이름으로 여러 개 체크된 값(예: 음주 빈도)은 ", " 로 묶어서 저장
+        answers = {key: ", ".join(request.form.getlist(key)) for key in request.form}
+        save_step_answers(patient.id, step, answers, saved_rows)
 
-        for key, value in request.form.items():
-            db.session.add(
-                PreOpAssessment(
-                    patient_id=patient.id,
-                    step=step,
-                    question=key,
-                    answer=value
-                )
-            )
-
-        db.session.commit()
-
-        # ⭐ Step9이면 종료로 이동
+        # ⭐ Step9이면 제출 완료 표시 + 네이트온 알림 예약 (답변과 같은 트랜잭션)
         if step == 9:
-            patient.submitted = True
-            patient.completed_at = datetime.utcnow()
-            db.session.commit()
+            row.submitted = True
+            row.completed_at = datetime.utcnow()
 
-            # ⭐ 네이트온 메시지 전송
-            from app.preop.utils import send_nateon_message
+            # 실제 전송은 백그라운드 outbox 에서 (웹훅이 느려도 바로 응답)
+            from app.notifications import enqueue_nateon
 
+            submitted_at = datetime.now(ZoneInfo('Asia/Seoul')).strftime('%Y-%m-%d %H:%M')
             msg = (
                 f"[수술 전 문진 제출 완료]\n"
                 f"이름: {patient.name}\n"
                 f"등록번호: {patient.patient_id}\n"
                 f"수술일: {patient.surgery_date}\n"
                 f"주치의: {patient.doctor_name}\n"
-                f"제출시간: {datetime.now(ZoneInfo('Asia/Seoul')).strftime('%Y-%m-%d %H:%M')}\n"
+                f"제출시간: {submitted_at}\n"
                 f"링크: https://nursing-assessment.onrender.com"
             )
-            send_nateon_message(msg)
+            summary = f"{patient.name} / {patient.patient_id} / 수술일 {patient.surgery_date} / {patient.doctor_name} / {submitted_at}"
+            enqueue_nateon(msg, summary=summary)
+
+        db.session.commit()
 
+        # ⭐ Step9이면 종료로 이동
+        if step == 9:
+            invalidate_patient(token)
             return redirect(url_for("preop.preop_complete", token=token))
 
 
@@ -226,6 +204,63 @@ def form_step(token, step):
 
 @preop_bp.route("/complete/<string:token>")
 def preop_complete(token):
-    form = PreOpPatient.query.filter_by(token=token).first_or_404()
+    form = get_patient(token)
+    if form is None:
+        abort(404)
 
     return render_template("preop/complete.html", form=form)
+
+
+# ======================================
+# 문진 상태 API (JSON)
+#  - state : 환자 기본 정보 + 전체 step 답변 (답변 쿼리 1번)
+#  - PATCH : 입력 칸 하나씩 자동 저장 (바뀐 질문만 씀)
+#  - step1(본인 확인), step4(이미지 업로드) 는 기존 POST 로만 저장
+#  - 제출 완료 처리는 step9 POST 에서만
+# ======================================
+AUTOSAVE_STEPS = (2, 3, 5, 6, 7, 8, 9)
+
+
+@preop_bp.route("/api/<token>/state")
+def api_state(token):
+    patient = get_patient(token)
+    if patient is None:
+        return jsonify({"status": "error", "message": "잘못된 접근입니다."}), 404
+
+    answers = load_all_answers(patient.id)
+
+    return jsonify({
+        "status": "success",
+        "patient": {
+            "name": patient.name,
+            "surgery_date": patient.surgery_date,
+            "surgery_name": patient.surgery_name,
+            "doctor_name": patient.doctor_name,
+            "submitted": bool(patient.submitted),
+        },
+        "answers": {str(step): data for step, data in answers.items()},
+    })
+
+
+@preop_bp.route("/api/<token>/step/<int:step>", methods=["PATCH"])
+def api_autosave(token, step):
+    patient = get_patient(token)
+    if patient is None:
+        return jsonify({"status": "error", "message": "잘못된 접근입니다."}), 404
+
+    if step not in AUTOSAVE_STEPS:
+        return jsonify({"status": "error", "message": "자동 저장할 수 없는 단계입니다."}), 400
+
+    fields = request.get_json(silent=True)
+    if not isinstance(fields, dict) or not fields or not all(
+        isinstance(q, str) and (a is None or isinstance(a, str)) for q, a in fields.items()
+    ):
+        return jsonify({"status": "error", "message": "잘못된 형식입니다."}), 400
+
+    if lock_patient_row(patient) is None:
+        return jsonify({"status": "error", "message": "잘못된 접근입니다."}), 404
+
+    changed = patch_step_answers(patient.id, step, fields)
+    db.session.commit()
+
+    return jsonify({"status": "success", "changed": changed})
@@ -1,13 +1,18 @@
 import requests
 from flask import current_app
 
+from app.metrics import timed_external
+
+
+@timed_external("nateon_webhook", ok=bool)
 def send_nateon_message(content: str):
+    """웹훅 전송. 성공하면 True (설정 안 돼 있거나 실패하면 False)"""
     webhook_url = current_app.config.get("NATEON_WEBHOOK_URL")
     if not webhook_url:
-        return  # 설정 안 돼 있으면 그냥 종료
+        return False  # 설정 안 돼 있으면 그냥 종료
 
     try:
-        requests.post(
+        res = requests.post(
             webhook_url,
             headers={"Content-Type": "application/x-www-form-urlencoded"},
             data={"content": content},
@@ -15,3 +20,9 @@ def send_nateon_message(content: str):
         )
     except Exception as e:
         current_app.logger.error(f"[NATEON ERROR] {e}")
+        return False
+
+    if res.status_code >= 400:
+        current_app.logger.error(f"[NATEON ERROR] HTTP {res.status_code}")
+        return False
+    return True
@@ -0,0 +1,204 @@
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from app import db
+
+# ===========================================
+# 느린 요청 프로파일링 (선택 기능)
+#  - PROFILE_SLOW_MS 이상 걸린 요청, 또는 PROFILE_SAMPLE_RATE 분의 1 요청을 기록
+#  - PROFILE_MODE
+#      "sample"   (기본) : 별도 스레드가 PROFILE_SAMPLE_INTERVAL_MS 마다 스택 수집
+#                          → .folded (flamegraph.pl / speedscope 에 바로 사용)
+#      "cprofile"        : 대상 요청 전체를 cProfile → .pstats (오버헤드 큼)
+#  - PROFILE_ROUTES 에 endpoint 를 적으면 그 라우트만 (쉼표 구분)
+#  - 파일 옆에 .json (route, 시간, 쿼리 수, 환자 수) 기록, 최근 PROFILE_KEEP 개만 보관
+#    (환자 token 이 들어가는 실제 경로 / view_args 는 남기지 않음)
+# ===========================================
+
+PROFILE_MODES = ("sample", "cprofile")
+
+
+class StackSampler:
+    """등록된 스레드의 현재 스택을 주기적으로 모아 접힌(folded) 스택 카운트로 집계"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        counter = Counter()
+        with self._lock:
+            self._targets[thread_id] = counter
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="bg-profile-sampler", daemon=True)
+                self._thread.start()
+        return counter
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, counter in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counter[fold_stack(frame)] += 1
+
+
+def fold_stack(frame):
+    """frame → "바깥;...;안쪽" (함수명 (파일:줄))"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+_sampler = None
+
+
+def note_patients(count):
+    """프로파일 기록에 남길 '처리한 환자 수' (라우트에서 호출)"""
+    if has_request_context():
+        g.profile_patients = count
+
+
+# ===========================================
+# Flask 훅
+# ===========================================
+def init_profiling(app):
+    """PROFILE_SLOW_MS 또는 PROFILE_SAMPLE_RATE 가 있을 때만 훅 등록 (db.init_app 이후 호출)"""
+    global _sampler
+
+    mode = app.config["PROFILE_MODE"]
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"PROFILE_MODE 값이 올바르지 않습니다: {mode}")
+
+    slow_ms = app.config["PROFILE_SLOW_MS"]
+    sample_rate = app.config["PROFILE_SAMPLE_RATE"]
+    if not slow_ms and not sample_rate:
+        return
+
+    routes = {r.strip() for r in app.config["PROFILE_ROUTES"].split(",") if r.strip()}
+    folder = os.path.join(app.config["STORAGE_ROOT"], "profiles")
+    os.makedirs(folder, exist_ok=True)
+
+    if mode == "sample":
+        _sampler = StackSampler(app.config["PROFILE_SAMPLE_INTERVAL_MS"] / 1000)
+
+    with app.app_context():
+        engine = db.engine
+
+    # 요청당 쿼리 수 (metrics 와 별개로 셈)
+    @event.listens_for(engine, "after_cursor_execute")
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and "profile_start" in g:
+            g.profile_queries += 1
+
+    @app.before_request
+    def _start_profile():
+        if routes and request.endpoint not in routes:
+            return
+
+        g.profile_start = time.perf_counter()
+        g.profile_queries = 0
+        g.profile_sampled = bool(sample_rate) and random.randrange(sample_rate) == 0
+
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                g.pop("profile_start")   # 다른 스레드에서 이미 프로파일 중 → 이번 요청은 건너뜀
+                return
+            g.profiler = profiler
+        else:
+            _sampler.start(threading.get_ident())
+
+    @app.after_request
+    def _finish_profile(response):
+        start = g.pop("profile_start", None)
+        if start is None:
+            return response
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+        stacks = _sampler.stop(threading.get_ident()) if _sampler else None
+
+        if g.profile_sampled or (slow_ms and elapsed_ms >= slow_ms):
+            try:
+                write_profile(folder, response, elapsed_ms, profiler, stacks, app.config["PROFILE_KEEP"])
+            except Exception:
+                app.logger.exception("[PROFILE] 저장 실패")
+
+        return response
+
+
+def write_profile(folder, response, elapsed_ms, profiler, stacks, keep):
+    endpoint = request.endpoint or "unmatched"
+    base = "{}_{}_{}ms".format(
+        datetime.now().strftime("%Y%m%d-%H%M%S-%f"),
+        re.sub(r"[^A-Za-z0-9_.-]", "_", endpoint),
+        int(elapsed_ms),
+    )
+    path = os.path.join(folder, base)
+
+    if profiler is not None:
+        profiler.dump_stats(path + ".pstats")
+        kind = "pstats"
+    else:
+        with open(path + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        kind = "folded"
+
+    meta = {
+        "endpoint": endpoint,
+        "route": request.url_rule.rule if request.url_rule else None,
+        "method": request.method,
+        "status": response.status_code,
+        "duration_ms": round(elapsed_ms, 1),
+        "queries": g.get("profile_queries", 0),
+        "patients": g.get("profile_patients"),
+        "sampled": g.get("profile_sampled", False),
+        "format": kind,
+        "pid": os.getpid(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    prune_profiles(folder, keep)
+
+
+def prune_profiles(folder, keep):
+    """최근 keep 개 프로파일만 남김"""
+    metas = sorted(n for n in os.listdir(folder) if n.endswith(".json"))
+    for name in metas[:-keep] if keep else []:
+        base = name[:-len(".json")]
+        for ext in (".json", ".pstats", ".folded"):
+            try:
+                os.remove(os.path.join(folder, base + ext))
+            except FileNotFoundError:
+                pass
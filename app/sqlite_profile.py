@@ -0,0 +1,87 @@
+from sqlalchemy import event
+
+from app import db
+
+# ===========================================
+# SQLite 동시성 설정 (모든 커넥션에 적용)
+#  - WAL       : 읽기가 쓰기를 기다리지 않음
+#  - busy_timeout : "database is locked" 대신 잠깐 기다렸다가 재시도
+#  - synchronous=NORMAL : WAL 에서 안전하면서 fsync 횟수 감소
+#  - cache_size / mmap_size : 페이지 캐시 / 메모리 맵 크기
+# ===========================================
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+DEFAULT_PROFILE = {
+    "SQLITE_JOURNAL_MODE": "WAL",
+    "SQLITE_BUSY_TIMEOUT": 5000,        # ms
+    "SQLITE_SYNCHRONOUS": "NORMAL",
+    "SQLITE_CACHE_SIZE": -20000,        # 음수 = KiB 단위 (약 20MB)
+    "SQLITE_MMAP_SIZE": 128 * 1024 * 1024,
+}
+
+
+def load_profile(environ):
+    """환경변수 → 설정값 (잘못된 값이면 ValueError)"""
+    profile = {}
+    for key, default in DEFAULT_PROFILE.items():
+        raw = environ.get(key)
+        profile[key] = default if raw is None else (int(raw) if isinstance(default, int) else raw.upper())
+
+    if profile["SQLITE_JOURNAL_MODE"] not in JOURNAL_MODES:
+        raise ValueError(f"SQLITE_JOURNAL_MODE 값이 올바르지 않습니다: {profile['SQLITE_JOURNAL_MODE']}")
+    if profile["SQLITE_SYNCHRONOUS"] not in SYNCHRONOUS_MODES:
+        raise ValueError(f"SQLITE_SYNCHRONOUS 값이 올바르지 않습니다: {profile['SQLITE_SYNCHRONOUS']}")
+    return profile
+
+
+def profile_pragmas(config):
+    return [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA cache_size={int(config['SQLITE_CACHE_SIZE'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+
+
+def apply_sqlite_profile(app):
+    """SQLite 엔진이면 새 커넥션마다 PRAGMA 실행 (db.init_app 이후 호출)"""
+    with app.app_context():
+        engine = db.engine
+
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = profile_pragmas(app.config)
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, connection_record):
+        cur = dbapi_conn.cursor()
+        try:
+            for pragma in pragmas:
+                cur.execute(pragma)
+        finally:
+            cur.close()
+
+
+def report_sqlite_settings(app):
+    """실제로 적용된 값 확인 (시작 시 로그), dict 반환"""
+    engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return {}
+
+    names = ["journal_mode", "busy_timeout", "synchronous", "cache_size", "mmap_size"]
+    with engine.connect() as conn:
+        settings = {n: conn.exec_driver_sql(f"PRAGMA {n}").scalar() for n in names}
+
+    print("ℹ️ [SQLITE] " + " ".join(f"{k}={v}" for k, v in settings.items()))
+
+    # 메모리 DB 는 journal_mode 가 항상 memory
+    expected = app.config["SQLITE_JOURNAL_MODE"].lower()
+    in_memory = engine.url.database in (None, "", ":memory:")
+    if not in_memory and str(settings["journal_mode"]).lower() != expected:
+        app.logger.warning(f"[SQLITE] journal_mode={settings['journal_mode']} (설정값 {expected} 적용 안 됨)")
+
+    return settings
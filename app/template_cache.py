@@ -0,0 +1,44 @@
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+# ===========================================
+# Jinja 템플릿 바이트코드 캐시 + 시작 시 미리 컴파일
+#  - STORAGE_ROOT/jinja_cache 에 컴파일 결과 저장 → 재시작 / 새 워커도 파싱 없이 로드
+#    (소스 내용이 바뀌면 체크섬이 달라져 자동으로 다시 컴파일)
+#  - TEMPLATE_WARMUP: create_app 끝에서 모든 blueprint 템플릿을 미리 로드
+#    → gunicorn --preload 면 마스터에서 한 번, fork 된 워커는 메모리 캐시 그대로 사용
+# ===========================================
+
+
+def init_template_cache(app):
+    """jinja_env 가 만들어지기 전에 호출 (blueprint 등록 전)"""
+    if not app.config["TEMPLATE_CACHE"]:
+        return
+
+    folder = os.path.join(app.config["STORAGE_ROOT"], "jinja_cache")
+    os.makedirs(folder, exist_ok=True)
+    app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache(folder)}
+
+
+def warm_templates(app):
+    """등록된 모든 템플릿(.html)을 컴파일해 jinja_env 캐시에 올려 둠, 로드한 개수 반환"""
+    env = app.jinja_env
+
+    # 메모리 캐시가 작으면 미리 올린 템플릿이 밀려나므로 개수만큼 확보
+    names = [n for n in env.list_templates() if n.endswith(".html")]
+    if env.cache is not None and env.cache.capacity < len(names):
+        app.logger.warning(f"[TEMPLATE] 템플릿 {len(names)}개 > 캐시 크기 {env.cache.capacity}")
+
+    start = time.perf_counter()
+    loaded = 0
+    for name in names:
+        try:
+            env.get_template(name)
+            loaded += 1
+        except Exception:
+            app.logger.exception(f"[TEMPLATE] 미리 컴파일 실패: {name}")
+
+    app.logger.debug(f"[TEMPLATE] {loaded}개 미리 컴파일 ({(time.perf_counter() - start) * 1000:.0f}ms)")
+    return loaded
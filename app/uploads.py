@@ -0,0 +1,49 @@
+import os
+import time
+from tempfile import SpooledTemporaryFile
+
+from flask import Request, current_app
+
+
+# ===========================================
+# 업로드 파일을 메모리 버퍼로 받는 Request
+#  - Werkzeug 기본값은 500KB 넘으면 임시파일로 내려씀
+#  - UPLOAD_SPOOL_MAX_BYTES 까지는 메모리에서 바로 파싱
+# ===========================================
+class SpooledRequest(Request):
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        max_size = current_app.config.get("UPLOAD_SPOOL_MAX_BYTES", 16 * 1024 * 1024)
+        return SpooledTemporaryFile(max_size=max_size, mode="rb+")
+
+
+# ===========================================
+# UPLOAD_FOLDER 에 남은 오래된 엑셀 파일 정리
+#  (예전 버전이 업로드 엑셀을 그대로 저장해 두던 것들)
+# ===========================================
+WORKBOOK_EXTENSIONS = (".xls", ".xlsx")
+
+
+def purge_stale_workbooks(folder=None, max_age=None):
+    """max_age 초보다 오래된 .xls/.xlsx 삭제, 삭제한 개수 반환"""
+    folder = folder or current_app.config["UPLOAD_FOLDER"]
+    if max_age is None:
+        max_age = current_app.config.get("UPLOAD_PURGE_MAX_AGE", 86400)
+
+    cutoff = time.time() - max_age
+    removed = 0
+
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.lower().endswith(WORKBOOK_EXTENSIONS):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass   # 다른 워커가 먼저 지움
+
+    if removed:
+        current_app.logger.info(f"[UPLOAD PURGE] 오래된 엑셀 {removed}개 삭제")
+    return removed
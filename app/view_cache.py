@@ -0,0 +1,176 @@
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app, render_template
+from markupsafe import Markup
+
+# ===========================================
+# 관리자 보기 화면(preop_view) 답변 영역 렌더링 캐시 (워커 프로세스마다)
+#  - 제출 완료(submitted) 환자만, 키는 (환자 id, updated_at)
+#    → 답변 저장 / 환자 수정이 있으면 updated_at 이 바뀌어 다른 워커의 캐시도 자동으로 무효
+#  - 캐시하는 것은 step 2~9 답변 영역 HTML 뿐 (상단 환자 정보 / 메뉴는 매번 렌더링)
+#  - 메모리 LRU (VIEW_CACHE_MAX_ENTRIES, 0 이면 사용 안 함)
+#  - VIEW_CACHE_SPILL 이면 밀려난 항목을 STORAGE_ROOT/view_cache 에 파일로 보관 (워커끼리 공유)
+#    환자당 파일 1개 (<환자 id>.html, 첫 줄이 updated_at) → 무효화는 폴더를 훑지 않고 파일 1개 삭제
+# ===========================================
+
+
+class ViewCache:
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def put(self, key, html, max_entries):
+        """저장 후 한도를 넘어 밀려난 (key, html) 리스트 반환"""
+        evicted = []
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                evicted.append(self._entries.popitem(last=False))
+        return evicted
+
+    def discard_patient(self, patient_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == patient_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+view_cache = ViewCache()
+
+
+# -------------------------------------------
+# 디스크 보관 (선택)
+# -------------------------------------------
+def _spill_folder():
+    if not current_app.config["VIEW_CACHE_SPILL"]:
+        return None
+    folder = os.path.join(current_app.config["STORAGE_ROOT"], "view_cache")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _spill_path(folder, patient_id):
+    return os.path.join(folder, f"{patient_id}.html")
+
+
+def _read_spill(folder, key):
+    """파일이 없거나 다른 시점(updated_at)의 것이면 None"""
+    patient_id, stamp = key
+    try:
+        with open(_spill_path(folder, patient_id), encoding="utf-8") as f:
+            if f.readline().rstrip("\n") != stamp:
+                return None
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_spill(folder, entries):
+    for (patient_id, stamp), html in entries:
+        path = _spill_path(folder, patient_id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(f"{stamp}\n")
+            f.write(html)
+        os.replace(tmp, path)   # 다른 워커가 쓰다 만 파일을 읽지 않도록
+
+    _prune_spill(folder, current_app.config["VIEW_CACHE_DISK_MAX_ENTRIES"])
+
+
+def _prune_spill(folder, keep):
+    """오래된 파일부터 지워서 keep 개만 남김"""
+    names = [n for n in os.listdir(folder) if n.endswith(".html")]
+    if len(names) <= keep:
+        return
+
+    def mtime(name):
+        try:
+            return os.path.getmtime(os.path.join(folder, name))
+        except FileNotFoundError:
+            return 0
+
+    for name in sorted(names, key=mtime)[:len(names) - keep]:
+        try:
+            os.remove(os.path.join(folder, name))
+        except FileNotFoundError:
+            pass
+
+
+# -------------------------------------------
+# 사용
+# -------------------------------------------
+def cache_key(patient):
+    """제출 완료 환자만 (id, 마지막 변경 시각) → 그 외 None
+
+    updated_at 이 없으면 마이그레이션 이후 바뀐 적이 없다는 뜻이므로 created_at 사용.
+    """
+    stamp = patient.updated_at or patient.created_at
+    if not patient.submitted or stamp is None:
+        return None
+    return patient.id, stamp.strftime("%Y%m%d%H%M%S%f")
+
+
+def render_answers(patient):
+    """step 2~9 답변 영역 HTML (캐시에 있으면 쿼리 / 렌더링 없이)"""
+    from app.preop.answers import load_all_answers
+
+    max_entries = current_app.config["VIEW_CACHE_MAX_ENTRIES"]
+    key = cache_key(patient) if max_entries > 0 else None
+
+    if key is not None:
+        html = view_cache.get(key)
+        if html is None:
+            folder = _spill_folder()
+            html = _read_spill(folder, key) if folder else None
+            if html is not None:
+                _store(key, html, max_entries)
+        if html is not None:
+            return Markup(html)
+
+    # {step: {question: answer}} (저장 방식과 관계없이 같은 모양)
+    html = render_template("admin_preop/view_answers.html", saved_data=load_all_answers(patient.id))
+
+    if key is not None:
+        _store(key, html, max_entries)
+    return Markup(html)
+
+
+def _store(key, html, max_entries):
+    evicted = view_cache.put(key, html, max_entries)
+    folder = _spill_folder()
+    if evicted and folder:
+        _write_spill(folder, evicted)
+
+
+def invalidate_view(patient_id=None):
+    """환자 1명 (None 이면 전체) 캐시 삭제, 디스크 보관분 포함"""
+    if patient_id is None:
+        view_cache.clear()
+    else:
+        view_cache.discard_patient(patient_id)
+
+    folder = _spill_folder()
+    if not folder:
+        return
+
+    # 환자 답변 저장 때마다 불리므로 환자 1명이면 그 파일만 지움
+    names = os.listdir(folder) if patient_id is None else [os.path.basename(_spill_path(folder, patient_id))]
+    for name in names:
+        try:
+            os.remove(os.path.join(folder, name))
+        except FileNotFoundError:
+            pass
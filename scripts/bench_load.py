@@ -0,0 +1,283 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+# ===========================================
+# 부하 벤치마크 (Flask test client + 스레드)
+#   python scripts/bench_load.py --patients 40 --admins 4 --concurrency 8 --output result.json
+#
+#  - 임시 STORAGE_ROOT 에 SQLite 파일 DB 를 만들고 환자 데이터 시드
+#  - 환자: /preop/start → step 1~9 (GET + POST) → 완료 화면
+#  - 관리자: 리스트 (날짜/검색) 조회, 가끔 엑셀 미리보기 + 일괄 등록
+#  - 라우트별 처리량 / p50 / p95 / p99 / 오류 / "database is locked" 횟수를 JSON 으로 출력
+#  - 같은 --seed 면 같은 요청 순서 (스레드 스케줄링 차이는 있음)
+#  - 환경변수(ANSWER_STORAGE, SQLITE_JOURNAL_MODE, LIST_PAGINATION ...) 로 설정을 바꿔 비교
+# ===========================================
+
+parser = argparse.ArgumentParser(description="문진/관리자 흐름 부하 벤치마크")
+parser.add_argument("--patients", type=int, default=40, help="문진을 끝까지 진행할 환자 수")
+parser.add_argument("--admins", type=int, default=4, help="동시에 조회하는 관리자 수")
+parser.add_argument("--admin-ops", type=int, default=30, help="관리자 1명당 요청 수")
+parser.add_argument("--concurrency", type=int, default=8, help="환자 스레드 수")
+parser.add_argument("--seed-patients", type=int, default=2000, help="미리 넣어 둘 환자 수")
+parser.add_argument("--excel-rows", type=int, default=300, help="일괄 등록에 쓰는 엑셀 행 수")
+parser.add_argument("--seed", type=int, default=1)
+parser.add_argument("--storage", help="STORAGE_ROOT (기본: 임시 폴더)")
+parser.add_argument("--output", help="결과 JSON 파일 (기본: 표준 출력)")
+args = parser.parse_args()
+
+os.environ["STORAGE_ROOT"] = args.storage or tempfile.mkdtemp(prefix="preop-bench-")
+os.environ.pop("DATABASE_URL", None)
+os.environ.setdefault("SMS_TRANSPORT", "stub")
+os.environ.setdefault("UPLOAD_PURGE_INTERVAL", "0")
+
+from flask import got_request_exception, request  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import PreOpPatient  # noqa: E402
+
+# 앱 시작 로그는 stderr 로 (stdout 은 결과 JSON 전용)
+with contextlib.redirect_stdout(sys.stderr):
+    app = create_app()
+
+ADMIN_LOGIN = {"username": "gokys2050", "password": "goys2015"}
+DOCTORS = ["김정형", "이척추", "박관절", "최수부", "정족부"]
+SURGERIES = ["슬관절 전치환술", "회전근개 봉합술", "척추 유합술", "전방십자인대 재건술", "수근관 유리술"]
+BASE_DATE = date(2026, 1, 5)
+
+
+# ===========================================
+# 기록
+# ===========================================
+class Recorder:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.lock_errors = {}
+
+    def record(self, label, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(label, []).append(seconds)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+    def lock_error(self, rule):
+        with self._lock:
+            self.lock_errors[rule] = self.lock_errors.get(rule, 0) + 1
+
+
+recorder = Recorder()
+
+
+def _on_exception(sender, exception, **extra):
+    # 서버 쪽 예외 중 SQLite 잠금 오류만 따로 집계
+    if "database is locked" in str(exception):
+        recorder.lock_error(request.url_rule.rule if request.url_rule else request.path)
+
+
+got_request_exception.connect(_on_exception, app)
+
+
+def timed(label, fn, *a, **kw):
+    start = time.perf_counter()
+    try:
+        res = fn(*a, **kw)
+        ok = res.status_code < 400
+    except Exception:
+        res, ok = None, False
+    recorder.record(label, time.perf_counter() - start, ok)
+    return res
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+# ===========================================
+# 시드
+# ===========================================
+def surgery_day(i):
+    return (BASE_DATE + timedelta(days=i % 60)).isoformat()
+
+
+def seed(rnd):
+    rows = [
+        {
+            "surgery_date": surgery_day(i),
+            "patient_id": f"B{i:08d}",
+            "name": f"환자{i}",
+            "gender": rnd.choice(["남", "여"]),
+            "age": str(rnd.randint(20, 90)),
+            "surgery_name": rnd.choice(SURGERIES),
+            "doctor_name": rnd.choice(DOCTORS),
+            "phone": f"010-{rnd.randint(1000, 9999)}-{rnd.randint(1000, 9999)}",
+            "token": f"bench{i:08d}",
+        }
+        for i in range(args.seed_patients + args.patients)
+    ]
+    with app.app_context():
+        db.session.execute(insert(PreOpPatient), rows)
+        db.session.commit()
+    return rows
+
+
+def schedule_workbook(rnd):
+    """parse_excel_gen 이 읽는 열 배치의 엑셀 (메모리)"""
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append([f"h{i}" for i in range(32)])
+    for i in range(args.excel_rows):
+        row = [""] * 32
+        row[5] = f"{surgery_day(1000 + i)} (월)"
+        row[7] = f"X{rnd.randint(0, 10 ** 7):08d}"
+        row[8] = f"엑셀환자{i}"
+        row[9] = rnd.choice(["남", "여"])
+        row[10] = f"{rnd.randint(20, 90)}세"
+        row[12] = rnd.choice(SURGERIES)
+        row[13] = rnd.choice(DOCTORS)
+        row[14] = "Gen"
+        row[30] = "010-0000-0000"
+        ws.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+# ===========================================
+# 시나리오
+# ===========================================
+def step_form(step, patient, rnd):
+    if step == 1:
+        return {"name": patient["name"], "surgery_date": patient["surgery_date"]}
+    if step == 4:
+        return {"oral_med": "없음", "oral_med_desc": "", "surgery_history": "있음",
+                "surgery_history_desc[]": ["2019 무릎", "2021 어깨"]}
+    return {f"q{step}_{i}": rnd.choice(["예", "아니오", "1"]) for i in range(12)}
+
+
+def patient_flow(patient, rnd):
+    client = app.test_client()
+    token = patient["token"]
+
+    timed("GET /preop/start", client.get, f"/preop/start/{token}")
+    for step in range(1, 10):
+        timed("GET /preop/form/step", client.get, f"/preop/form/{token}/step/{step}")
+        timed(f"POST /preop/form/step{step}", client.post,
+              f"/preop/form/{token}/step/{step}", data=step_form(step, patient, rnd))
+    timed("GET /preop/complete", client.get, f"/preop/complete/{token}")
+
+
+def admin_flow(rnd, workbook):
+    client = app.test_client()
+    timed("POST /auth/login", client.post, "/auth/login", data=ADMIN_LOGIN)
+
+    for _ in range(args.admin_ops):
+        roll = rnd.random()
+        if roll < 0.5:
+            timed("GET /admin/preop/list?date", client.get,
+                  f"/admin/preop/list?date={surgery_day(rnd.randrange(60))}&page={rnd.randint(1, 3)}")
+        elif roll < 0.9:
+            q = rnd.choice([f"환자{rnd.randrange(args.seed_patients)}", rnd.choice(DOCTORS), "B0000", "무릎"])
+            timed("GET /admin/preop/list?q", client.get, f"/admin/preop/list?q={q}")
+        else:
+            res = timed("POST /admin/preop/parse_excel_gen", client.post, "/admin/preop/parse_excel_gen",
+                        data={"excel_file": (io.BytesIO(workbook), "schedule.xlsx")},
+                        content_type="multipart/form-data")
+            patients = (res.get_json(silent=True) or {}).get("patients") if res is not None else None
+            if patients:
+                timed("POST /admin/preop/create_excel_multi", client.post,
+                      "/admin/preop/create_excel_multi", json={"patients": patients})
+
+
+def run_pool(jobs, concurrency):
+    queue = list(jobs)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not queue:
+                    return
+                job = queue.pop(0)
+            job()
+
+    threads = [threading.Thread(target=worker) for _ in range(max(1, concurrency))]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def main():
+    rnd = random.Random(args.seed)
+    rows = seed(rnd)
+    workbook = schedule_workbook(rnd)
+    walkers = rows[args.seed_patients:]
+
+    patient_jobs = [
+        (lambda p=p, r=random.Random(args.seed * 1000 + i): patient_flow(p, r))
+        for i, p in enumerate(walkers)
+    ]
+    admin_jobs = [
+        (lambda r=random.Random(args.seed * 7919 + i): admin_flow(r, workbook))
+        for i in range(args.admins)
+    ]
+
+    started = time.perf_counter()
+    threads = run_pool(patient_jobs, args.concurrency) + run_pool(admin_jobs, args.admins)
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    routes = {}
+    for label, values in sorted(recorder.samples.items()):
+        routes[label] = {
+            "count": len(values),
+            "errors": recorder.errors.get(label, 0),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(max(values) * 1000, 2),
+        }
+
+    total = sum(r["count"] for r in routes.values())
+    result = {
+        "config": {
+            **{k: v for k, v in vars(args).items() if k not in ("output", "storage")},
+            "database": app.config["SQLALCHEMY_DATABASE_URI"].split("@")[-1],
+            "answer_storage": app.config["ANSWER_STORAGE"],
+            "list_pagination": app.config["LIST_PAGINATION"],
+            "sqlite": {k: app.config.get(k) for k in ("SQLITE_JOURNAL_MODE", "SQLITE_BUSY_TIMEOUT", "SQLITE_SYNCHRONOUS")},
+        },
+        "elapsed_s": round(elapsed, 3),
+        "requests": total,
+        "errors": sum(r["errors"] for r in routes.values()),
+        "throughput_rps": round(total / elapsed, 2),
+        "lock_errors": recorder.lock_errors,
+        "routes": routes,
+    }
+
+    out = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(out + "\n")
+        print(f"✅ {total}건 / {elapsed:.1f}초 ({result['throughput_rps']} req/s) → {args.output}", file=sys.stderr)
+    else:
+        print(out)
+
+
+main()
@@ -0,0 +1,17 @@
+import os
+
+# 이 스크립트가 초기화를 직접 하므로 create_app 안의 버전 확인은 건너뜀
+os.environ["DB_BOOTSTRAP"] = "skip"
+
+from app import create_app  # noqa: E402
+from app.bootstrap import bootstrap_database, bootstrap_lock  # noqa: E402
+from app.migrations import current_version  # noqa: E402
+
+# 사용법 (배포 시 gunicorn 실행 전에 한 번):
+#   python scripts/bootstrap.py   → 테이블 생성 + 마이그레이션 + 기본 관리자 계정
+
+app = create_app()
+
+with app.app_context(), bootstrap_lock(app):
+    bootstrap_database()
+    print(f"✅ bootstrap done (스키마 버전 {current_version()})")
@@ -0,0 +1,294 @@
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from app import create_app, db
+from app.admin_preop.excel_normalize import (
+    COL_AGE, COL_DOCTOR_NAME, COL_GEN, COL_GENDER, COL_NAME, COL_PATIENT_ID,
+    COL_PHONE, COL_SURGERY_DATE, COL_SURGERY_NAME,
+)
+from app.models import PreOpPatient, dump_answers
+
+# ===========================================
+# 대량 테스트 데이터 생성
+#   python scripts/generate_dataset.py --patients 20000 --days 365 --workbooks 5 --seed 7
+#
+#  - 현재 설정된 DB (DATABASE_URL 또는 STORAGE_ROOT/database.db) 에 환자 + 9단계 문진 답변 추가
+#  - ANSWER_STORAGE=json 이면 preop_step_answers 에, 아니면 preop_assessments 에 기록
+#  - --workbooks N : 앞쪽 N 개 수술일의 스케줄 엑셀을 parse_excel_gen 열 배치 그대로 생성
+#  - 같은 --seed 면 항상 같은 데이터 (생성 데이터는 token 이 "gen" 으로 시작)
+#  - --clear : 이전에 생성한 데이터 삭제 후 생성
+#  - 속도를 위해 ORM 대신 드라이버 executemany 로 batch 삽입
+# ===========================================
+
+parser = argparse.ArgumentParser(description="대량 테스트 데이터 생성")
+parser.add_argument("--patients", type=int, default=10000)
+parser.add_argument("--days", type=int, default=365, help="수술일을 퍼뜨릴 기간 (일)")
+parser.add_argument("--start", default="2026-01-01", help="첫 수술일")
+parser.add_argument("--doctors", type=int, default=12)
+parser.add_argument("--submitted", type=float, default=0.7, help="문진 제출 완료 비율")
+parser.add_argument("--workbooks", type=int, default=0, help="생성할 스케줄 엑셀 수")
+parser.add_argument("--out", help="엑셀 저장 폴더 (기본: EXCEL_OUTPUT/generated)")
+parser.add_argument("--batch-size", type=int, default=2000, help="한 번에 넣을 환자 수")
+parser.add_argument("--seed", type=int, default=1)
+parser.add_argument("--clear", action="store_true", help="이전 생성 데이터 삭제")
+args = parser.parse_args()
+
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+GIVEN = ["민준", "서연", "도윤", "지우", "하준", "서윤", "은우", "지호", "수아", "예준",
+         "영숙", "정희", "순자", "영수", "상철", "미경", "경자", "종숙", "성호", "현주"]
+SURGERIES = [
+    "Rt. TKRA", "Lt. TKRA", "Rt. Arthroscopic RCR", "Lt. Arthroscopic RCR", "ACL reconstruction",
+    "L4-5 PLIF", "L5-S1 discectomy", "Rt. CTR", "Hallux valgus correction", "Lt. THRA",
+]
+CHIEF = ["무릎 통증", "어깨 통증", "허리 통증", "다리 저림", "손목 저림", "발목 불안정"]
+CAUSE = ["넘어짐", "운동 중 부상", "특별한 원인 없음", "교통사고", "무거운 물건 들다가"]
+
+STEP3_FIELDS = ["htn", "heart", "dm", "stroke", "asthma", "thyroid", "gi", "hepatitis", "tb", "ra", "wound"]
+FAMILY = ["family_htn", "family_dm", "family_stroke", "family_cancer"]
+
+
+# -------------------------------------------
+# 9단계 답변 (실제 폼이 보내는 키 그대로, 빈 칸 포함)
+# -------------------------------------------
+def yn(rnd, p_yes):
+    return "유" if rnd.random() < p_yes else "무"
+
+
+def step_answers(rnd, patient):
+    steps = {
+        1: {"name": patient["name"], "surgery_date": patient["surgery_date"]},
+        2: {
+            "height": str(rnd.randint(145, 188)),
+            "weight": str(rnd.randint(42, 105)),
+            "chief_complaint": rnd.choice(CHIEF),
+            "injury_cause": rnd.choice(CAUSE),
+        },
+    }
+
+    s3 = {}
+    for f in STEP3_FIELDS:
+        s3[f] = yn(rnd, 0.25 if f in ("htn", "dm") else 0.05)
+        s3[f"{f}_desc"] = "약 복용 중" if s3[f] == "유" else ""
+    steps[3] = s3
+
+    steps[4] = {
+        "oral_med": yn(rnd, 0.4),
+        "oral_med_desc": "",
+        "surgery_history": yn(rnd, 0.3),
+        "surgery_history_desc": "",
+    }
+    if steps[4]["surgery_history"] == "유":
+        steps[4]["surgery_history_desc"] = "|".join(f"{rnd.randint(2005, 2024)} 수술" for _ in range(rnd.randint(1, 3)))
+
+    s5 = {"general_good": "1", "emotion": rnd.choice(["양호", "양호", "불안"]), "emotion_desc": ""}
+    for f in ("vision", "hearing", "sleep", "bowel", "urination", "therapeutic_diet", "wtloss"):
+        s5[f] = yn(rnd, 0.1)
+        if f != "wtloss":
+            s5[f"{f}_desc"] = ""
+    if rnd.random() < 0.5:
+        s5["vision_glasses"] = "1"
+    s5["eating_normal"] = "1"
+    steps[5] = s5
+
+    steps[6] = {
+        "gastritis": rnd.choice(["예", "아니오", "아니오"]),
+        "motion_sickness": yn(rnd, 0.15),
+        "pain_sensitive": rnd.choice(["예", "아니오"]),
+        "pain_tolerance": rnd.choice(["예", "아니오"]),
+        "pain_notes": "",
+    }
+
+    s7 = {"dental_treatment": yn(rnd, 0.1), "dental_treatment_desc": "", "tooth_notes": ""}
+    s7[rnd.choice(["tooth_normal", "tooth_normal", "tooth_implant", "tooth_prosthesis"])] = "1"
+    steps[7] = s7
+
+    s8 = {"alcohol": yn(rnd, 0.4), "smoking": yn(rnd, 0.2), "smoking_amount": "", "alcohol_amount": "",
+          "alcohol_type_other": ""}
+    if s8["alcohol"] == "유":
+        s8["alcohol_frequency"] = rnd.choice(["1~2회", "2~3회", "4~5회", "매일"])
+        s8["alcohol_type_soju"] = "1"
+    steps[8] = s8
+
+    s9 = {
+        "allergy_main": yn(rnd, 0.1), "allergy_other": "",
+        "drug_allergy": yn(rnd, 0.08), "drug_allergy_desc": "",
+        "food_allergy": yn(rnd, 0.05), "food_allergy_desc": "",
+        "family_main": yn(rnd, 0.3),
+    }
+    for f in FAMILY:
+        s9[f"{f}_desc"] = ""
+        if s9["family_main"] == "유" and rnd.random() < 0.4:
+            s9[f] = "1"
+    steps[9] = s9
+
+    return steps
+
+
+# -------------------------------------------
+# 생성
+# -------------------------------------------
+def make_patients(rnd, start, doctors):
+    for i in range(args.patients):
+        surgery_date = (start + timedelta(days=rnd.randrange(args.days))).isoformat()
+        yield {
+            "surgery_date": surgery_date,
+            "patient_id": f"{rnd.randrange(10 ** 8, 10 ** 9)}",
+            "name": rnd.choice(SURNAMES) + rnd.choice(GIVEN),
+            "gender": rnd.choice(["남", "여"]),
+            "age": str(rnd.randint(18, 92)),
+            "surgery_name": rnd.choice(SURGERIES),
+            "doctor_name": rnd.choice(doctors),
+            "phone": f"010-{rnd.randint(1000, 9999)}-{rnd.randint(1000, 9999)}",
+            "token": f"gen{rnd.getrandbits(116):029x}",
+            "submitted": rnd.random() < args.submitted,
+        }
+
+
+def placeholders(conn, n):
+    mark = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    return ", ".join([mark] * n)
+
+
+def insert_batch(conn, batch, rnd, json_storage):
+    now = datetime.utcnow()
+
+    cols = ["surgery_date", "patient_id", "name", "gender", "age", "surgery_name",
+            "doctor_name", "phone", "token", "submitted", "created_at", "sms_sent", "sms_sent_at"]
+    conn.exec_driver_sql(
+        f"INSERT INTO preop_patients ({', '.join(cols)}) VALUES ({placeholders(conn, len(cols))})",
+        [
+            (p["surgery_date"], p["patient_id"], p["name"], p["gender"], p["age"], p["surgery_name"],
+             p["doctor_name"], p["phone"], p["token"], p["submitted"],
+             now, p["submitted"], now if p["submitted"] else None)
+            for p in batch
+        ],
+    )
+
+    # 방금 넣은 환자의 id (token 기준)
+    tokens = [p["token"] for p in batch]
+    ids = dict(conn.exec_driver_sql(
+        f"SELECT token, id FROM preop_patients WHERE token IN ({placeholders(conn, len(tokens))})",
+        tuple(tokens),
+    ).fetchall())
+
+    rows = []
+    for p in batch:
+        if not p["submitted"]:
+            continue
+        pid = ids[p["token"]]
+        for step, answers in step_answers(rnd, p).items():
+            if json_storage:
+                rows.append((pid, step, dump_answers(answers), now))
+            else:
+                rows.extend((pid, step, q, a) for q, a in answers.items())
+
+    if not rows:
+        return 0
+
+    if json_storage:
+        conn.exec_driver_sql(
+            f"INSERT INTO preop_step_answers (patient_id, step, data, updated_at) VALUES ({placeholders(conn, 4)})",
+            rows,
+        )
+    else:
+        conn.exec_driver_sql(
+            f"INSERT INTO preop_assessments (patient_id, step, question, answer) VALUES ({placeholders(conn, 4)})",
+            rows,
+        )
+    return len(rows)
+
+
+def clear_generated(conn):
+    sub = "SELECT id FROM preop_patients WHERE token LIKE 'gen%'"
+    for table in ("preop_assessments", "preop_step_answers"):
+        conn.exec_driver_sql(f"DELETE FROM {table} WHERE patient_id IN ({sub})")
+    return conn.exec_driver_sql("DELETE FROM preop_patients WHERE token LIKE 'gen%'").rowcount
+
+
+# -------------------------------------------
+# 스케줄 엑셀 (parse_excel_gen 이 읽는 열 배치)
+# -------------------------------------------
+def write_workbooks(patients, folder, rnd):
+    import openpyxl
+
+    os.makedirs(folder, exist_ok=True)
+    by_date = {}
+    for p in patients:
+        by_date.setdefault(p["surgery_date"], []).append(p)
+
+    width = COL_PHONE + 2
+    written = []
+    for day in sorted(by_date)[:args.workbooks]:
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("수술스케줄")
+        ws.append([f"열{i + 1}" for i in range(width)])
+
+        weekday = "월화수목금토일"[date.fromisoformat(day).weekday()]
+        rows = [(p, "Gen") for p in by_date[day]]
+        # 국소마취 환자 섞기 (미리보기에서 빠져야 함)
+        rows += [(rnd.choice(by_date[day]), "Loc") for _ in range(max(1, len(rows) // 10))]
+
+        for p, anesthesia in rows:
+            row = [""] * width
+            row[COL_SURGERY_DATE] = f"{day} ({weekday})"
+            row[COL_PATIENT_ID] = int(p["patient_id"]) if rnd.random() < 0.5 else p["patient_id"]
+            row[COL_NAME] = f" {p['name']} "
+            row[COL_GENDER] = p["gender"]
+            row[COL_AGE] = f"{p['age']}세"
+            row[COL_SURGERY_NAME] = p["surgery_name"]
+            row[COL_DOCTOR_NAME] = p["doctor_name"]
+            row[COL_GEN] = anesthesia
+            row[COL_PHONE] = p["phone"]
+            ws.append(row)
+
+        path = os.path.join(folder, f"schedule_{day}.xlsx")
+        wb.save(path)
+        written.append(path)
+
+    return written
+
+
+def main():
+    app = create_app()
+    rnd = random.Random(args.seed)
+    start = date.fromisoformat(args.start)
+    doctors = [f"{SURNAMES[i % len(SURNAMES)]}주치{i + 1}" for i in range(args.doctors)]
+
+    with app.app_context():
+        json_storage = app.config["ANSWER_STORAGE"] == "json"
+        t0 = time.perf_counter()
+        patients = []
+        answer_rows = 0
+
+        with db.engine.begin() as conn:
+            if args.clear:
+                print(f"🧹 이전 생성 데이터 {clear_generated(conn)}명 삭제")
+
+            batch = []
+            for p in make_patients(rnd, start, doctors):
+                batch.append(p)
+                if len(batch) >= args.batch_size:
+                    answer_rows += insert_batch(conn, batch, rnd, json_storage)
+                    patients.extend(batch)
+                    batch = []
+            if batch:
+                answer_rows += insert_batch(conn, batch, rnd, json_storage)
+                patients.extend(batch)
+
+        elapsed = time.perf_counter() - t0
+        kind = "step JSON 문서" if json_storage else "문진 답변 행"
+        print(f"✅ 환자 {len(patients)}명, {kind} {answer_rows}개 ({elapsed:.1f}초)")
+
+        if args.workbooks:
+            folder = args.out or os.path.join(app.config["EXCEL_OUTPUT"], "generated")
+            for path in write_workbooks(patients, folder, rnd):
+                print(f"📄 {path}")
+
+        # 리스트 화면 건수 캐시 / 환자 검색 인덱스는 트리거로 같이 반영됨
+        print(f"ℹ️ 전체 환자 수: {PreOpPatient.query.count()}")
+
+
+main()
@@ -0,0 +1,21 @@
+import sys
+
+from app import create_app
+from app.migrations import MIGRATIONS, current_version, run_migrations
+
+# 사용법:
+#   python scripts/migrate.py           → 적용 안 된 마이그레이션 실행
+#   python scripts/migrate.py status    → 현재 버전 / 대기 중인 마이그레이션 확인
+
+app = create_app()
+
+with app.app_context():
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        version = current_version()
+        print(f"현재 스키마 버전: {version}")
+        for v, description, _ in MIGRATIONS:
+            mark = "✅" if v <= version else "⏳"
+            print(f"  {mark} {v}: {description}")
+    else:
+        applied = run_migrations()
+        print(f"✅ migration done (적용 {len(applied)}개, 현재 버전 {current_version()})")
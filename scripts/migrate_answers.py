@@ -0,0 +1,41 @@
+import sys
+
+from app import create_app, db
+from app.models import PreOpAssessment, PreOpStepAnswers
+from app.preop.answers import copy_eav_to_json, copy_json_to_eav
+
+# ===========================================
+# 문진 답변 저장 방식 전환
+#   python scripts/migrate_answers.py json [--purge]
+#       preop_assessments(질문별 행) → preop_step_answers(step별 JSON)
+#       --purge : 옮긴 뒤 preop_assessments 비우기
+#   python scripts/migrate_answers.py eav [--purge]
+#       반대 방향 (--purge : preop_step_answers 비우기)
+#
+# 옮긴 뒤 ANSWER_STORAGE 환경변수를 같은 값으로 바꾸고 재시작
+# ===========================================
+
+if len(sys.argv) < 2 or sys.argv[1] not in ("json", "eav"):
+    print("사용법: python scripts/migrate_answers.py json|eav [--purge]")
+    sys.exit(1)
+
+target = sys.argv[1]
+purge = "--purge" in sys.argv[2:]
+
+app = create_app()
+
+with app.app_context():
+    if target == "json":
+        count = copy_eav_to_json()
+        print(f"✅ step JSON 문서 {count}개 생성")
+        if purge:
+            PreOpAssessment.query.delete()
+            db.session.commit()
+            print("✅ preop_assessments 비움")
+    else:
+        count = copy_json_to_eav()
+        print(f"✅ 질문별 행 {count}개 생성")
+        if purge:
+            PreOpStepAnswers.query.delete()
+            db.session.commit()
+            print("✅ preop_step_answers 비움")
@@ -1,18 +1,10 @@
-from sqlalchemy import text
-from app import create_app, db
-
-app = create_app()
-
-with app.app_context():
-    cols = [r[1] for r in db.session.execute(text("PRAGMA table_info(preop_patients)")).all()]
-
-    if "sms_sent" not in cols:
-        db.session.execute(text("ALTER TABLE preop_patients ADD COLUMN sms_sent INTEGER DEFAULT 0"))
-        print("✅ added sms_sent")
-
-    if "sms_sent_at" not in cols:
-        db.session.execute(text("ALTER TABLE preop_patients ADD COLUMN sms_sent_at TEXT"))
-        print("✅ added sms_sent_at")
-
-    db.session.commit()
-    print("✅ migration done")
+from app import create_app
+from app.migrations import run_migrations
+
+# sms_sent / sms_sent_at 컬럼 추가는 app/migrations.py 의 1번 마이그레이션으로 옮겨짐
+# (예전 명령 호환용: python scripts/migrate.py 와 동일)
+app = create_app()
+
+with app.app_context():
+    run_migrations()
+    print("✅ migration done")